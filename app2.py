@@ -1,11 +1,21 @@
 import streamlit as st
 import os
-from main import get_transcript, translate_summary, summarize_transcript, text_to_speech, audio_to_text
+from main import get_transcript, translate_summary, summarize_transcript, text_to_speech, audio_to_text, get_data
+from metrics import start_http_server
+import profiling
+from errors import PipelineError
+from summarize import is_english
+from model_backends import MULTILINGUAL_SUMMARY_MODEL
+from routing import AUTO
+from highlight import PAGE_WORDS, align, page_count, render
 from annotated_text import annotated_text
 from streamlit_player import st_player
-from pytube import YouTube
 
 
+# Expose pipeline metrics for Prometheus when a port is configured
+if os.environ.get("METRICS_PORT"):
+    start_http_server(int(os.environ["METRICS_PORT"]))
+
 # Initialize session state
 if 'transcript' not in st.session_state:
     st.session_state.transcript = ""
@@ -19,14 +29,20 @@ if 'summed' not in st.session_state:
     st.session_state.summed = ""
 if 'translated' not in st.session_state:
     st.session_state.translated = ""
+if 'manual_subtitles' not in st.session_state:
+    st.session_state.manual_subtitles = False
 if 'audi' not in st.session_state:
     st.session_state.audi = ""
+if 'audi_for' not in st.session_state:
+    st.session_state.audi_for = None
 if 'to_continue' not in st.session_state:
     st.session_state.to_continue=True
 if 'to_run' not in st.session_state:
     st.session_state.to_run=True    
 if 'title' not in st.session_state:
     st.session_state.title=""
+if 'language' not in st.session_state:
+    st.session_state.language=None
     
 def main():
     st.markdown(
@@ -105,12 +121,13 @@ def main():
     unsafe_allow_html=True
 )   
     
-    def highlight_common_text(summary1, summary2):
-        common_text = set(summary1.split()) & set(summary2.split())
-        return common_text
+    # Switches profiling for all sessions and inference workers, see profiling.py
+    profile = st.sidebar.checkbox("Profile inference jobs", value=profiling.enabled(), help=f"Writes profiles to {profiling.PROFILE_DIR}")
+    if profile != profiling.enabled():
+        profiling.set_enabled(profile)
+
     st.markdown("<br>", unsafe_allow_html=True)
     option = st.radio("Choose your input format:", ["Enter a Link", "Upload an Audio File"])
-    error_dict=["An error during transcription.","An error during translation.","An error occured during fetching video data.","An error transcribing audio file.","An error occured during generating audible summary.","An error occured during summarization.","Video not found, enter a valid youtube video link.","An error occured during transcription.",'An Error occurred with given link.',"Only english language is supported for transcription."]
     st.markdown("<br>", unsafe_allow_html=True)
     if option == "Enter a Link":
         message_placeholder = st.empty()
@@ -118,8 +135,8 @@ def main():
         video_link = st.text_input("Enter the YouTube video link", key="video_link")
         if video_link:
             try:
-                yt=YouTube(video_link)
-                st.session_state.title=yt.title
+                # Video data is archived, so reruns don't fetch it again
+                st.session_state.title=get_data(video_link)["Title"]
             except:
                 st.warning("Please enter a valid link!")  
                 video_link=""  
@@ -130,10 +147,16 @@ def main():
             with st.spinner("Generating transcript..."):
                 message_placeholder = st.empty()
                 message_placeholder.info('Might take a while if no transcript is available', icon="ℹ️")
-                transcript = get_transcript(video_link)
+                try:
+                    transcript, st.session_state.manual_subtitles = get_transcript(
+                        video_link, on_language=lambda language: st.session_state.update(language=language))
+                except PipelineError as e:
+                    transcript = ""
+                    st.error(str(e))
                 message_placeholder.empty()
                 
             st.session_state.transcript = transcript
+            st.session_state.to_continue = bool(transcript)
             st.session_state.summary = ""
             st.session_state.expander_state = True
 
@@ -144,9 +167,15 @@ def main():
                 f.write(uploaded_file.getbuffer())
             st.success("File uploaded successfully!")
             with st.spinner("Processing audio file..."):
-                transcript = audio_to_text("", True)
+                try:
+                    transcript = audio_to_text("", True, on_language=lambda language: st.session_state.update(language=language))
+                    st.session_state.manual_subtitles = False
+                except PipelineError as e:
+                    transcript = ""
+                    st.error(str(e))
                 st.session_state.to_run=False
             st.session_state.transcript = transcript
+            st.session_state.to_continue = bool(transcript)
             st.session_state.summary = ""
             st.session_state.expander_state = True
 
@@ -155,13 +184,7 @@ def main():
         
         with st.expander("Transcript", expanded=st.session_state.expander_state):
             st.markdown('<div class="expander-content">{}</div>'.format(st.session_state.transcript), unsafe_allow_html=True)          
-            for i in error_dict:
-                if str(st.session_state.transcript)==str(i):
-                    st.session_state.to_continue=False
-                    st.session_state.transcript="" 
-                else:
-                    st.session_state.to_continue=True
-                    
+
 
     if st.session_state.transcript or st.session_state.summed:    
         st.download_button("Download",st.session_state.transcript,key="download_transcript_button",file_name=f"Transcript-{st.session_state.title}.txt")    
@@ -208,9 +231,11 @@ def main():
         st.markdown("<br>", unsafe_allow_html=True)
         
         message_placeholder = st.empty()
-        message_placeholder.info("Availiable models 1: Google T5, 2: DistilBart", icon="ℹ️")
+        message_placeholder.info("Availiable models 1: Google T5, 2: DistilBart, Auto: picked from the transcript length to fit the latency budget", icon="ℹ️")
+        if not is_english(st.session_state.language) and MULTILINGUAL_SUMMARY_MODEL:
+            st.caption(f"The transcript is in '{st.session_state.language}' and is summarized in that language; translate the summary below.")
         st.markdown("<br>", unsafe_allow_html=True)
-        model_choice = st.selectbox("Select a model to perform summarization", [1, 2 ], key="model_choice")
+        model_choice = st.selectbox("Select a model to perform summarization", [1, 2, AUTO], key="model_choice")
 
         if st.button("Summarize"):
             message_placeholder.empty()
@@ -218,10 +243,20 @@ def main():
                 
                 transcript = st.session_state.transcript
                 with st.spinner("Summarizing transcript..."):
-                    summary = summarize_transcript(transcript, model_choice)
-                st.session_state.summary = summary
-                st.session_state.expander_state = False
-                st.session_state.summed = st.session_state.summary
+                    reports = []
+                    try:
+                        summary = summarize_transcript(transcript, model_choice, on_report=reports.append, language=st.session_state.language,
+                                                       manual_subtitles=st.session_state.manual_subtitles,
+                                                       video_link=st.session_state.get("video_link") if option == "Enter a Link" else None)
+                    except PipelineError as e:
+                        summary = ""
+                        st.error(str(e))
+                for plan in reports:
+                    st.caption(f"{plan.model_name} ({plan.num_beams} beams): expected {plan.expected_seconds:.1f}s, took {plan.actual_seconds:.1f}s")
+                if summary:
+                    st.session_state.summary = summary
+                    st.session_state.expander_state = False
+                    st.session_state.summed = st.session_state.summary
 
     # Display Summarized Text
     if st.session_state.summary:
@@ -237,16 +272,8 @@ def main():
         summary1 = st.session_state.summary
         summary2 = st.session_state.transcript
 
-        # Highlight common text
-        common_text = highlight_common_text(summary1, summary2)
-
-        # Generate highlighted summaries
-        highlighted_summary1 = " ".join(
-            ['<span class="highlight">{}</span>'.format(word) if word in common_text else word for word in
-             summary1.split()])
-        highlighted_summary2 = " ".join(
-            ['<span class="highlight">{}</span>'.format(word) if word in common_text else word for word in
-             summary2.split()])
+        # Highlight common passages, aligned once per summary and cached
+        summary_words, summary_runs, transcript_words, transcript_runs = align(summary1, summary2)
 
         # Define CSS styles for the highlights and container
         highlight_style = """
@@ -298,10 +325,16 @@ def main():
         # Header container
         st.markdown("<div class='header-container'>", unsafe_allow_html=True)
         st.markdown("<h1 class='header'>View Comparison</h1>", unsafe_allow_html=True)
-        st.info("The highlighted text represents the words that overlap.", icon="ℹ️")
+        st.info("The highlighted text represents the passages that overlap.", icon="ℹ️")
         st.markdown("</div>", unsafe_allow_html=True)
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown(highlight_style, unsafe_allow_html=True)
+
+        # Only one page of a long transcript is rendered per rerun
+        transcript_pages = page_count(transcript_words)
+        transcript_page = st.number_input(f"Transcript page (of {transcript_pages})", min_value=1, max_value=transcript_pages, value=1, key=f"transcript_page_{transcript_pages}") if transcript_pages > 1 else 1
+        highlighted_summary1 = render(summary_words, summary_runs)
+        highlighted_summary2 = render(transcript_words, transcript_runs, transcript_page, PAGE_WORDS)
         with st.container():
             st.markdown(
                 """
@@ -335,11 +368,16 @@ def main():
         if st.button("Translate") or st.session_state.translated:
             ty = st.session_state.textty
             with st.spinner("Translating summary..."):
-                translated_text = translate_summary(ty, lang_choice_translate)
-            with st.expander("Translated Summary", expanded=True):
-                st.session_state.translated = translated_text
-                st.markdown('<div class="expander-content">{}</div>'.format(st.session_state.translated), unsafe_allow_html=True)
-            st.download_button("Download",st.session_state.translated,key="download_translated_button",file_name=f"Translated-{st.session_state.title}.txt")    
+                try:
+                    translated_text = translate_summary(ty, lang_choice_translate)
+                except PipelineError as e:
+                    translated_text = ""
+                    st.error(str(e))
+            st.session_state.translated = translated_text
+            if translated_text:
+                with st.expander("Translated Summary", expanded=True):
+                    st.markdown('<div class="expander-content">{}</div>'.format(st.session_state.translated), unsafe_allow_html=True)
+                st.download_button("Download",st.session_state.translated,key="download_translated_button",file_name=f"Translated-{st.session_state.title}.txt")    
 
         # Text to Speech
         st.markdown("<br>", unsafe_allow_html=True)
@@ -350,15 +388,35 @@ def main():
         lang_choice_tts = st.selectbox("Select Language for audible summary", ["English", "French", "German"],
                                        key="lang_choice_tts")
 
-        if st.button("Generate Audio") or st.session_state.audi:
-            summary = st.session_state.summary
+        summary = st.session_state.summary
+        # Regenerate on rerun only when the summary or language changed since the last audio
+        stale = st.session_state.audi and st.session_state.audi_for != (summary, lang_choice_tts)
+        if st.button("Generate Audio") or stale:
+            first_chunk = {}
+            preview = st.empty()
+
+            def show_first_chunk(audio):
+                # A player of its own, so listening can start while the rest is generated
+                first_chunk["audio"] = audio
+                with preview.container():
+                    st.caption("Beginning of the audible summary")
+                    st.audio(audio, format="audio/mp3")
+
             with st.spinner("Generating audio file..."):
-                audio_file = text_to_speech(summary, lang_choice_tts)
-                
+                try:
+                    audio_file = text_to_speech(summary, lang_choice_tts, on_first_chunk=show_first_chunk)
+                except PipelineError as e:
+                    audio_file = b""
+                    st.error(str(e))
+            if audio_file == first_chunk.get("audio"):
+                # Synthesized in one chunk (or from the cache): the full player below is enough
+                preview.empty()
             st.session_state.audi = audio_file
-            filename='savedaudiofile.mp3'
-            st.audio(filename)
-            st.download_button(label="Download audio",data=open(filename,'rb'),file_name=f"Audible summary-{st.session_state.title}.mp3")
+            st.session_state.audi_for = (summary, lang_choice_tts)
+
+        if st.session_state.audi:
+            st.audio(st.session_state.audi, format="audio/mp3")
+            st.download_button(label="Download audio",data=st.session_state.audi,file_name=f"Audible summary-{st.session_state.title}.mp3")
 
             
 if __name__ == '__main__':
@@ -0,0 +1,252 @@
+"""
+Compressed archive of processed videos.
+
+Each video is stored as separate frames: its transcript with the timed
+segments, its metadata (see features.get_vid_data) and one frame per summary.
+Frames are compressed one by one (zstd when the zstandard package is
+installed, zlib otherwise) and appended to shard files; an SQLite index maps
+each video ID and frame to its shard, offset and length, so a single video is
+read and decompressed without touching the rest of the archive, and adding a
+summary or metadata doesn't rewrite the much larger transcript.
+
+Segments are stored column-wise: start times and durations in centiseconds,
+delta-encoded, and the texts as one list, which compresses far better than a
+list of dictionaries.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+ARCHIVE_DIR = os.environ.get(
+    "ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".archive"))
+# Start a new shard file once the current one reaches this size
+ARCHIVE_SHARD_BYTES = 1024 * 1024 * 1024
+ZSTD_LEVEL = 10
+
+# Codecs, as recorded per record in the index
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compress(data):
+    """
+    Returns:
+        tuple: The codec used and the compressed bytes.
+    """
+    zstandard = _zstandard()
+    if zstandard is not None:
+        return ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return ZLIB, zlib.compress(data, 9)
+
+
+def decompress(codec, data):
+    """
+    Returns:
+        bytes: The decompressed record.
+    """
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    if codec == ZSTD:
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError("The archive record is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+@contextlib.contextmanager
+def _locked(path):
+    """
+    Hold an exclusive lock on path, shared by all processes writing the archive.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # No cross-process locking on this platform; the thread lock still applies
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def pack_segments(segments):
+    """
+    Convert {"start", "end", "text"} segments to delta-encoded columns.
+    """
+    starts, durations, texts = [], [], []
+    previous = 0
+    for segment in segments:
+        start = round(segment["start"] * 100)
+        starts.append(start - previous)
+        durations.append(round((segment["end"] - segment["start"]) * 100))
+        texts.append(segment["text"])
+        previous = start
+    return {"start": starts, "duration": durations, "text": texts}
+
+
+def unpack_segments(columns):
+    """
+    Convert columns written by pack_segments back to {"start", "end", "text"} segments.
+    """
+    segments = []
+    start = 0
+    for delta, duration, text in zip(columns["start"], columns["duration"], columns["text"]):
+        start += delta
+        segments.append({"start": start / 100, "end": (start + duration) / 100, "text": text})
+    return segments
+
+
+# Frames of a video, besides one "summary:<model>" frame per summary
+TRANSCRIPT = "transcript"
+METADATA = "metadata"
+_SUMMARY = "summary:"
+
+
+class Archive:
+    """
+    Append-only store of processed videos with random access by video ID.
+
+    Writing a frame again replaces its index entry; the previous frame stays
+    in its shard as garbage. Writes are serialized between threads and, through
+    a lock file, between processes (e.g. the app and the ingest worker).
+
+    Args:
+        directory (str): Where the shards and the index are stored.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_path = os.path.join(directory, "write.lock")
+        self._index = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._index.execute(
+            "CREATE TABLE IF NOT EXISTS frames (video_id TEXT, frame TEXT, shard INTEGER, offset INTEGER, "
+            "length INTEGER, codec TEXT, PRIMARY KEY (video_id, frame))")
+
+    def _shard_path(self, shard):
+        return os.path.join(self.directory, f"shard-{shard:05d}.bin")
+
+    def _read(self, shard, offset, length, codec):
+        with open(self._shard_path(shard), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return json.loads(decompress(codec, data))
+
+    def _frames(self, video_id, frame=None):
+        """
+        Returns:
+            dict: Frame name -> decoded frame, for all frames of the video or only the given one.
+        """
+        query = "SELECT frame, shard, offset, length, codec FROM frames WHERE video_id = ?"
+        params = (video_id,)
+        if frame is not None:
+            query += " AND frame = ?"
+            params += (frame,)
+        with self._lock:
+            rows = self._index.execute(query, params).fetchall()
+        return {name: self._read(shard, offset, length, codec) for name, shard, offset, length, codec in rows}
+
+    def get(self, video_id):
+        """
+        Read the record of a video.
+
+        Args:
+            video_id (str): The YouTube video ID.
+
+        Returns:
+            dict: The "transcript", "language", "manual_subtitles", "segments",
+            "summaries" and "metadata" of the video, or None if it isn't archived.
+        """
+        frames = self._frames(video_id)
+        if not frames:
+            return None
+        record = frames.get(TRANSCRIPT) or {
+            "transcript": None, "language": None, "manual_subtitles": None, "segments": None}
+        record["segments"] = unpack_segments(record["segments"]) if record["segments"] else None
+        record["metadata"] = frames.get(METADATA)
+        record["summaries"] = {name[len(_SUMMARY):]: summary for name, summary in frames.items()
+                               if name.startswith(_SUMMARY)}
+        return record
+
+    def put(self, video_id, transcript=None, language=None, segments=None, summaries=None, metadata=None,
+            manual_subtitles=None):
+        """
+        Archive a video, merging with its existing record: fields passed as
+        None keep their archived value, and summaries are added to the archived
+        ones. Only the frames holding the given fields are written.
+
+        Args:
+            video_id (str): The YouTube video ID.
+            transcript (str): The transcript text.
+            language (str): The language code of the transcript.
+            segments (list): Timed {"start", "end", "text"} segments.
+            summaries (dict): Summaries by model name or choice.
+            metadata (dict): The video data, see features.get_vid_data.
+            manual_subtitles (bool): Whether the transcript came from manual subtitles.
+        """
+        # The read-merge-write must not interleave with another writer's
+        with self._lock, _locked(self._lock_path):
+            frames = {}
+            fields = (("transcript", transcript), ("language", language), ("segments", segments),
+                      ("manual_subtitles", manual_subtitles))
+            if any(value is not None for _, value in fields):
+                frame = self._frames(video_id, TRANSCRIPT).get(TRANSCRIPT) or {
+                    "transcript": None, "language": None, "manual_subtitles": None, "segments": None}
+                for field, value in fields:
+                    if value is not None:
+                        frame[field] = pack_segments(value) if field == "segments" else value
+                frames[TRANSCRIPT] = frame
+            if metadata is not None:
+                frames[METADATA] = metadata
+            for key, summary in (summaries or {}).items():
+                frames[_SUMMARY + str(key)] = summary
+            if not frames:
+                return
+
+            entries = []
+            for name, frame in frames.items():
+                codec, data = compress(json.dumps(frame, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                entries.append((name, codec, data))
+            # Other processes may have started a new shard
+            shard = self._index.execute("SELECT MAX(shard) FROM frames").fetchone()[0] or 0
+            path = self._shard_path(shard)
+            if os.path.exists(path) and os.path.getsize(path) >= ARCHIVE_SHARD_BYTES:
+                shard += 1
+                path = self._shard_path(shard)
+            rows = []
+            with open(path, "ab") as f:
+                for name, codec, data in entries:
+                    rows.append((video_id, name, shard, f.tell(), len(data), codec))
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._index:
+                self._index.executemany("INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def __contains__(self, video_id):
+        with self._lock:
+            return self._index.execute("SELECT 1 FROM frames WHERE video_id = ?", (video_id,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._index.execute("SELECT COUNT(DISTINCT video_id) FROM frames").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._index.close()
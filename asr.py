@@ -0,0 +1,172 @@
+import os
+import threading
+
+from audio import SAMPLE_RATE
+
+# Speech recognition engine, e.g. ASR_BACKEND=faster-whisper
+ASR_BACKEND = os.environ.get("ASR_BACKEND", "whisper")
+# Whisper model size used by either engine
+ASR_MODEL = os.environ.get("ASR_MODEL", "base")
+# Characters of the previous window's transcript passed on as decoding context
+CONTEXT_CHARS = 224
+
+
+class WhisperBackend:
+    """
+    Reference openai-whisper implementation (PyTorch, FP32 on CPU).
+
+    Args:
+        model_size (str): The Whisper model size, e.g. "base".
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_size=ASR_MODEL):
+        self.model_size = model_size
+        self._model = None
+        self._lock = threading.Lock()
+        # Decoding installs kv-cache hooks on the shared model, so only one
+        # transcription may run on it at a time
+        self._transcribe_lock = threading.Lock()
+
+    def load(self):
+        """
+        Load the model, if it isn't loaded yet.
+        """
+        with self._lock:
+            if self._model is None:
+                import whisper
+                self._model = whisper.load_model(self.model_size)
+        return self._model
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe audio.
+
+        Args:
+            audio (numpy.ndarray): 16 kHz mono float32 samples.
+            **options: Extra decoding options passed to the engine, e.g. initial_prompt.
+
+        Returns:
+            dict: The transcript "text", the detected "language" and the timed
+            "segments" ({"start", "end", "text"} dictionaries).
+        """
+        model = self.load()
+        with self._transcribe_lock:
+            result = model.transcribe(audio, **options)
+        segments = [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+        return {"text": result["text"], "language": result["language"], "segments": segments}
+
+
+class FasterWhisperBackend:
+    """
+    CPU-optimized Whisper on CTranslate2 (faster-whisper) with int8 weights.
+
+    Args:
+        model_size (str): The Whisper model size, e.g. "base".
+        compute_type (str): The CTranslate2 compute type, e.g. "int8" or "float32".
+        cpu_threads (int): Threads used for inference, 0 for the engine default.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size=ASR_MODEL, compute_type="int8", cpu_threads=0):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Load the model, if it isn't loaded yet.
+        """
+        with self._lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                self._model = WhisperModel(self.model_size, device="cpu", compute_type=self.compute_type,
+                                           cpu_threads=self.cpu_threads)
+        return self._model
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe audio.
+
+        Args:
+            audio (numpy.ndarray): 16 kHz mono float32 samples.
+            **options: Extra decoding options passed to the engine, e.g. initial_prompt.
+
+        Returns:
+            dict: The transcript "text", the detected "language" and the timed
+            "segments" ({"start", "end", "text"} dictionaries).
+        """
+        # CTranslate2 models may be used from several threads at once
+        segments, info = self.load().transcribe(audio, **options)
+        segments = [{"start": s.start, "end": s.end, "text": s.text} for s in segments]
+        return {"text": "".join(s["text"] for s in segments), "language": info.language, "segments": segments}
+
+
+ASR_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_asr_backend(name=None, model_size=None):
+    """
+    Return the shared instance of a speech recognition backend.
+
+    Args:
+        name (str): One of ASR_BACKENDS. Defaults to ASR_BACKEND.
+        model_size (str): The Whisper model size. Defaults to ASR_MODEL.
+
+    Returns:
+        The backend, whose model is loaded on first use and then kept in memory.
+    """
+    name = name or ASR_BACKEND
+    model_size = model_size or ASR_MODEL
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend {name!r}, expected one of {tuple(ASR_BACKENDS)}")
+    with _backends_lock:
+        if (name, model_size) not in _backends:
+            _backends[(name, model_size)] = ASR_BACKENDS[name](model_size)
+        return _backends[(name, model_size)]
+
+
+def transcribe_windows(backend, windows):
+    """
+    Transcribe audio window by window, carrying context across windows.
+
+    The tail of the transcript so far is passed to the next window as its
+    initial prompt, and the language detected in the first window is reused.
+    Each window is released once it is transcribed, so memory stays bounded
+    by the window size.
+
+    Args:
+        backend: The speech recognition backend.
+        windows: Iterable of 16 kHz mono float32 sample arrays, see audio.iter_audio_windows.
+
+    Returns:
+        dict: The transcript "text", the "language", the timed "segments" with
+        times relative to the start of the audio, and the total "duration" in seconds.
+    """
+    texts, segments = [], []
+    language, context, offset = None, None, 0.0
+    for window in windows:
+        options = {}
+        if context:
+            options["initial_prompt"] = context
+        if language:
+            options["language"] = language
+        result = backend.transcribe(window, **options)
+        language = language or result["language"]
+        for segment in result["segments"]:
+            segments.append({"start": segment["start"] + offset, "end": segment["end"] + offset, "text": segment["text"]})
+        texts.append(result["text"].strip())
+        context = " ".join(texts)[-CONTEXT_CHARS:]
+        offset += len(window) / SAMPLE_RATE
+        del window, result
+    return {"text": " ".join(texts), "language": language, "segments": segments, "duration": offset}
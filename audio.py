@@ -0,0 +1,295 @@
+import contextlib
+import glob
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from coalesce import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Sample rate expected by the speech recognition models
+SAMPLE_RATE = 16000
+
+# Decoded 16 kHz mono PCM of downloaded videos, one <video id>.pcm file each
+AUDIO_CACHE_DIR = os.environ.get(
+    "AUDIO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".audio_cache"))
+# Size limit of AUDIO_CACHE_DIR; decoded audio takes about 115 MB per hour
+AUDIO_CACHE_BYTES = int(os.environ.get("AUDIO_CACHE_BYTES", str(2 * 1024 ** 3)))
+# Length of the windows that long audio is decoded and transcribed in;
+# each window takes 4 bytes per sample in memory (about 7.7 MB for 120 s)
+STREAM_WINDOW_SECONDS = int(os.environ.get("STREAM_WINDOW_SECONDS", "120"))
+# Lowest audio-only bitrate considered adequate for speech recognition
+MIN_AUDIO_KBPS = 48
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_BACKOFF = 1.0
+# Partial downloads left by other processes are deleted after this many seconds
+STALE_DOWNLOAD_SECONDS = 24 * 3600
+
+_fetches = SingleFlight("audio_inflight")
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """
+    Decode an audio file to mono float32 PCM with ffmpeg.
+
+    Args:
+        path (str): The audio file to decode.
+        sample_rate (int): The sample rate to resample to.
+
+    Returns:
+        numpy.ndarray: The samples, scaled to [-1, 1].
+    """
+    import numpy as np
+
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(output, np.int16).astype(np.float32) / 32768.0
+
+
+def iter_audio_windows(path, window_seconds=STREAM_WINDOW_SECONDS, sample_rate=SAMPLE_RATE):
+    """
+    Decode audio in fixed windows, so that memory use doesn't grow with its length.
+
+    Cached .pcm files are read window by window; anything else is decoded by
+    an ffmpeg process whose output is consumed one window at a time.
+
+    Args:
+        path (str): The audio file or cached PCM file.
+        window_seconds (int): The length of each window.
+        sample_rate (int): The sample rate to resample to.
+
+    Yields:
+        numpy.ndarray: The samples of the next window as float32, scaled to [-1, 1].
+    """
+    import numpy as np
+
+    window_bytes = window_seconds * sample_rate * 2
+    if path.endswith(".pcm"):
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(window_bytes)
+                if not data:
+                    return
+                yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    decoded = False
+    try:
+        while True:
+            data = process.stdout.read(window_bytes)
+            if not data:
+                break
+            decoded = True
+            yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    if not decoded and process.returncode != 0:
+        raise RuntimeError(f"Failed to load audio: ffmpeg exited with status {process.returncode}")
+
+
+def pcm_cache_path(video_id):
+    """
+    Returns:
+        str: Where the decoded audio of the video is cached.
+    """
+    return os.path.join(AUDIO_CACHE_DIR, f"{video_id}.pcm")
+
+
+def prune_audio_cache(max_bytes=AUDIO_CACHE_BYTES, keep=()):
+    """
+    Delete the least recently used decoded audio until the cache fits in max_bytes.
+
+    Args:
+        max_bytes (int): The size limit of the cache.
+        keep (tuple): Paths that must not be deleted.
+    """
+    for work_dir in glob.glob(os.path.join(AUDIO_CACHE_DIR, "*.download")):
+        with contextlib.suppress(FileNotFoundError):
+            if time.time() - os.path.getmtime(work_dir) > STALE_DOWNLOAD_SECONDS:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    files = glob.glob(os.path.join(AUDIO_CACHE_DIR, "*.pcm"))
+    files.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(path) for path in files)
+    for path in files:
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        total -= os.path.getsize(path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _kbps(stream):
+    try:
+        return int(stream.abr.rstrip("kbps"))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def select_audio_stream(streams):
+    """
+    Pick the smallest audio-only stream with at least MIN_AUDIO_KBPS, or the
+    best available one when every stream is below that.
+
+    Args:
+        streams: The pytube StreamQuery of a video.
+
+    Returns:
+        pytube.Stream: The chosen stream, or None if the video has no audio-only stream.
+    """
+    audio_streams = sorted(streams.filter(only_audio=True), key=_kbps)
+    if not audio_streams:
+        return None
+    adequate = [stream for stream in audio_streams if _kbps(stream) >= MIN_AUDIO_KBPS]
+    return adequate[0] if adequate else audio_streams[-1]
+
+
+def download_with_resume(url, path, retries=DOWNLOAD_RETRIES):
+    """
+    Download url to path in chunks, resuming from the bytes already on disk
+    after a failure.
+
+    Args:
+        url (str): The URL to download.
+        path (str): The destination file. A partial file is resumed.
+        retries (int): Attempts before giving up.
+    """
+    for attempt in range(retries):
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        request = urllib.request.Request(url, headers={"Range": f"bytes={offset}-"} if offset else {})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                # 200 means the server ignored the range, so start over
+                mode = "ab" if offset and response.status == 206 else "wb"
+                with open(path, mode) as f:
+                    shutil.copyfileobj(response, f, DOWNLOAD_CHUNK_SIZE)
+            return
+        except urllib.error.HTTPError as e:
+            if e.code == 416:
+                # Range not satisfiable: the file is already complete
+                return
+            error = e
+        except OSError as e:
+            error = e
+        logger.warning("Audio download interrupted (%s), resuming", error)
+        time.sleep(DOWNLOAD_BACKOFF * (2 ** attempt))
+    raise error
+
+
+def _download_pytube(video_link, work_dir):
+    from pytube import YouTube
+
+    stream = select_audio_stream(YouTube(video_link).streams)
+    if stream is None:
+        raise RuntimeError("No audio-only stream available")
+    path = os.path.join(work_dir, f"audio-{stream.itag}.{stream.subtype}")
+    download_with_resume(stream.url, path)
+    return path
+
+
+def _download_ytdlp(video_link, work_dir):
+    import yt_dlp
+
+    options = {
+        "format": f"worstaudio[abr>={MIN_AUDIO_KBPS}]/worstaudio/bestaudio/worst",
+        "outtmpl": os.path.join(work_dir, "audio-ytdlp.%(ext)s"),
+        "continuedl": True,
+        "retries": DOWNLOAD_RETRIES,
+        "quiet": True,
+        "noprogress": True,
+    }
+    with yt_dlp.YoutubeDL(options) as ydl:
+        ydl.download([video_link])
+    return glob.glob(os.path.join(work_dir, "audio-ytdlp.*"))[0]
+
+
+def decode_to_pcm(source, destination, sample_rate=SAMPLE_RATE):
+    """
+    Decode an audio file to a 16 kHz mono s16le PCM file with ffmpeg.
+
+    Args:
+        source (str): The audio file to decode.
+        destination (str): The PCM file to write.
+        sample_rate (int): The sample rate to resample to.
+    """
+    # A name of its own, so processes decoding the same video don't collide
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(destination), prefix=os.path.basename(destination) + ".",
+                                   suffix=".tmp")
+    os.close(fd)
+    command = [
+        "ffmpeg", "-nostdin", "-y", "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), partial,
+    ]
+    try:
+        subprocess.run(command, capture_output=True, check=True)
+        os.replace(partial, destination)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partial)
+
+
+def fetch_audio(video_link, video_id):
+    """
+    Get the decoded audio of a YouTube video, downloading it only once.
+
+    The smallest adequate audio-only stream is downloaded with pytube, resuming
+    interrupted transfers; yt-dlp is used when pytube fails. The audio is
+    decoded to 16 kHz mono PCM and cached by video ID, and the download is
+    deleted. The cache is kept within AUDIO_CACHE_BYTES. Concurrent calls for
+    the same video share one download.
+
+    Args:
+        video_link (str): The link to the YouTube video.
+        video_id (str): The ID of the video.
+
+    Returns:
+        str: The path of the cached PCM file, read with iter_audio_windows.
+    """
+    return _fetches.do(video_id, _fetch_audio, video_link, video_id)
+
+
+def _fetch_audio(video_link, video_id):
+    destination = pcm_cache_path(video_id)
+    if os.path.exists(destination):
+        # Mark as recently used for prune_audio_cache
+        os.utime(destination)
+        return destination
+
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    # Partial downloads are kept per video and process, so that a later attempt
+    # in this process can resume them without colliding with other processes
+    work_dir = os.path.join(AUDIO_CACHE_DIR, f"{video_id}.{os.getpid()}.download")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        source = _download_pytube(video_link, work_dir)
+    except Exception:
+        logger.warning("pytube audio download failed, falling back to yt-dlp", exc_info=True)
+        source = _download_ytdlp(video_link, work_dir)
+    decode_to_pcm(source, destination)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    prune_audio_cache(keep=(destination,))
+    return destination
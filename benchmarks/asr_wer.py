@@ -0,0 +1,91 @@
+"""
+Compare speech recognition backends on the bundled audio sample.
+
+Usage:
+    python benchmarks/asr_wer.py [--audio audio_file.mp3.mp3] [--reference-text ref.txt]
+                                 [--reference whisper] [--candidates faster-whisper]
+                                 [--model base] [--output results.json]
+
+Without --reference-text the transcript of the reference backend is used as
+the ground truth, so the word error rate measures how far a faster engine
+drifts from the reference implementation. Real-time factor is the
+transcription time divided by the audio duration (lower is faster).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_AUDIO = os.path.join(ROOT, "audio_file.mp3.mp3")
+
+
+def transcribe(backend_name, model_size, audio):
+    """
+    Transcribe audio with a backend, timing the model load and the inference separately.
+
+    Returns:
+        dict: The transcript and timings.
+    """
+    from asr import get_asr_backend
+
+    backend = get_asr_backend(backend_name, model_size)
+    started = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = backend.transcribe(audio)
+    return {
+        "backend": backend_name,
+        "model": model_size,
+        "load_seconds": load_seconds,
+        "transcribe_seconds": time.perf_counter() - started,
+        "text": result["text"].strip(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", default=DEFAULT_AUDIO)
+    parser.add_argument("--reference-text", help="file with the ground-truth transcript")
+    parser.add_argument("--reference", default="whisper", help="backend whose transcript is the ground truth")
+    parser.add_argument("--candidates", nargs="+", default=["faster-whisper"])
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    import jiwer
+    from audio import SAMPLE_RATE, load_audio
+
+    audio = load_audio(args.audio)
+    audio_seconds = len(audio) / SAMPLE_RATE
+    transform = jiwer.Compose([
+        jiwer.ToLowerCase(), jiwer.RemovePunctuation(), jiwer.RemoveMultipleSpaces(), jiwer.Strip(),
+    ])
+
+    results = [transcribe(args.reference, args.model, audio)]
+    results += [transcribe(name, args.model, audio) for name in args.candidates]
+    if args.reference_text:
+        with open(args.reference_text) as f:
+            reference = f.read()
+    else:
+        reference = results[0]["text"]
+
+    for result in results:
+        result["wer"] = jiwer.wer(transform(reference), transform(result["text"]))
+        result["real_time_factor"] = result["transcribe_seconds"] / audio_seconds
+        print(f"{result['backend']:16} {result['model']:8} load {result['load_seconds']:5.1f}s  "
+              f"transcribe {result['transcribe_seconds']:6.1f}s  RTF {result['real_time_factor']:.3f}  "
+              f"WER {result['wer']:.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"audio": args.audio, "audio_seconds": audio_seconds, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
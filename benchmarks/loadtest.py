@@ -0,0 +1,251 @@
+"""
+Simulate concurrent users driving the main.py entry points.
+
+Usage:
+    python benchmarks/loadtest.py [--rate 2] [--duration 60] [--concurrency 16]
+                                  [--mix link=3,upload=1,summarize=3,translate=2,tts=2]
+                                  [--videos 20] [--summary-model t5-small] [--asr-model tiny]
+                                  [--output results.json]
+
+Requests arrive at the target rate (Poisson arrivals) and are served by up to
+--concurrency simultaneous sessions. YouTube captions, Google Translate and
+Google TTS are replaced by local stand-ins (benchmarks/stubs.py), so the test
+measures this node rather than the network. Latency is counted from the
+scheduled arrival time, so queueing delay under overload is included.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.pipeline import AUDIO_SAMPLE, load_fixture_text, percentile, sized_text
+
+DEFAULT_MIX = "link=3,upload=1,summarize=3,translate=2,tts=2"
+
+
+def parse_mix(value):
+    """
+    Parse "operation=weight,..." into a dictionary of weights.
+    """
+    mix = {}
+    for item in value.split(","):
+        operation, weight = item.split("=")
+        mix[operation.strip()] = float(weight)
+    return mix
+
+
+def _peak_rss_kb(pid):
+    """
+    Returns:
+        int: The peak resident memory (VmHWM) of a running process in kB, 0 if unknown.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class WorkerMemorySampler:
+    """
+    Record the peak resident memory of each inference worker while the test runs.
+
+    The workers are alive when the report is made, so RUSAGE_CHILDREN (which
+    only counts children that have exited) would leave out the processes that
+    hold the models. Workers replaced during the test keep their last sample.
+
+    Args:
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def sample(self):
+        from workers import worker_pids
+
+        for pid in worker_pids():
+            self.peaks[pid] = max(self.peaks.get(pid, 0), _peak_rss_kb(pid))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def peak_rss_mb(worker_peaks=None):
+    """
+    Args:
+        worker_peaks (dict): Peak resident memory in kB by worker process ID, see WorkerMemorySampler.
+
+    Returns:
+        float: Peak resident memory of this process plus the inference workers, in MB.
+    """
+    # ru_maxrss is reported in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (own + sum((worker_peaks or {}).values())) / 1024
+
+
+def build_operations(video_count, summary_text, summary_short):
+    """
+    Returns:
+        dict: Operation name -> callable issuing one request through main.py.
+    """
+    import main
+
+    # Valid 11-character video IDs served by the local caption source
+    video_ids = [f"loadtest{i:03d}" for i in range(video_count)]
+
+    return {
+        "link": lambda: main.get_transcript(f"https://www.youtube.com/watch?v={random.choice(video_ids)}"),
+        "upload": lambda: main.audio_to_text("", True),
+        "summarize": lambda: main.summarize_transcript(summary_text, 1),
+        "translate": lambda: main.translate_summary(summary_short, random.choice(["French", "German"])),
+        "tts": lambda: main.text_to_speech(summary_short, random.choice(["English", "French", "German"])),
+    }
+
+
+def run(rate, duration, concurrency, mix, operations, seed=0):
+    """
+    Issue requests at the target rate for duration seconds and collect their outcomes.
+
+    Returns:
+        list: (operation, latency seconds, error) tuples.
+    """
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    outcomes, lock = [], threading.Lock()
+
+    def serve(name, scheduled):
+        # Entry points raise errors.PipelineError when a stage fails
+        try:
+            operations[name]()
+            error = False
+        except Exception:
+            error = True
+        with lock:
+            outcomes.append((name, time.perf_counter() - scheduled, error))
+
+    started = time.perf_counter()
+    next_arrival = started
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while next_arrival < started + duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(serve, rng.choices(names, weights)[0], next_arrival)
+            next_arrival += rng.expovariate(rate)
+    return outcomes, time.perf_counter() - started
+
+
+def report(outcomes, elapsed, worker_peaks=None):
+    """
+    Returns:
+        dict: Overall and per-operation throughput, latency percentiles and error rates.
+    """
+    def stats(items):
+        latencies = [latency for _, latency, _ in items]
+        errors = sum(1 for _, _, error in items if error)
+        return {
+            "requests": len(items),
+            "throughput": len(items) / elapsed,
+            "error_rate": errors / len(items),
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies),
+        }
+
+    by_operation = {}
+    for outcome in outcomes:
+        by_operation.setdefault(outcome[0], []).append(outcome)
+    return {
+        "elapsed_seconds": elapsed,
+        "overall": stats(outcomes),
+        "operations": {name: stats(items) for name, items in sorted(by_operation.items())},
+        "peak_rss_mb": peak_rss_mb(worker_peaks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to generate load for")
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous sessions")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--videos", type=int, default=20, help="distinct video IDs requested")
+    parser.add_argument("--summary-model", default="t5-small")
+    parser.add_argument("--asr-model", default="tiny")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # Chosen through the environment so that inference workers (INFERENCE_WORKERS) use them too
+    os.environ["SUMMARY_MODEL_1"] = args.summary_model
+    os.environ["ASR_MODEL"] = args.asr_model
+    from benchmarks.stubs import LocalCaptionSource, LocalTranslationBackend, LocalTTSBackend
+    import features
+    import transcription
+
+    corpus = load_fixture_text()
+    transcription.set_caption_source(LocalCaptionSource(corpus))
+    features.set_translation_backend(LocalTranslationBackend())
+    features.set_tts_backend(LocalTTSBackend())
+
+    previous = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    try:
+        # Uploads are read from audio_file0.mp3 in the working directory
+        shutil.copy(AUDIO_SAMPLE, os.path.join(work_dir, "audio_file0.mp3"))
+        os.chdir(work_dir)
+        # Turn the persistent result cache off, so requests measure the pipeline
+        # rather than cache reads (concurrent identical requests are still coalesced)
+        os.environ["RESULT_CACHE_BYTES"] = "0"
+        os.environ["ARCHIVE_DIR"] = ""
+        operations = build_operations(args.videos, sized_text(corpus, 5000), sized_text(corpus, 800))
+        with WorkerMemorySampler() as sampler:
+            outcomes, elapsed = run(args.rate, args.duration, args.concurrency, parse_mix(args.mix), operations, args.seed)
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = report(outcomes, elapsed, sampler.peaks)
+    overall = results["overall"]
+    print(f"{overall['requests']} requests in {elapsed:.1f}s: {overall['throughput']:.2f} req/s, "
+          f"p50 {overall['p50']:.2f}s, p95 {overall['p95']:.2f}s, p99 {overall['p99']:.2f}s, "
+          f"errors {overall['error_rate']:.1%}, peak RSS {results['peak_rss_mb']:.0f} MB")
+    for name, stats in results["operations"].items():
+        print(f"  {name:10} {stats['requests']:5d} req  p50 {stats['p50']:7.2f}s  p95 {stats['p95']:7.2f}s  "
+              f"errors {stats['error_rate']:.1%}")
+    if args.output:
+        results["config"] = vars(args)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
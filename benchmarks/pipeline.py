@@ -0,0 +1,204 @@
+"""
+Benchmark the pipeline stages on recorded fixtures, without network access.
+
+Usage:
+    python benchmarks/pipeline.py [--stages clean_summary get_extractive_summary ...]
+                                  [--sizes 1000 5000 20000] [--repeats 5]
+                                  [--summary-model t5-small] [--asr-model tiny]
+                                  [--output results.json] [--compare baseline.json]
+
+Transcripts come from benchmarks/fixtures, speech recognition runs on the
+bundled audio_file.mp3.mp3, translation uses a local stub instead of Google,
+and summarization and speech recognition use small local models. Latency
+percentiles and throughput are written as JSON, and --compare prints the
+change against a previous run.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+AUDIO_SAMPLE = os.path.join(ROOT, "audio_file.mp3.mp3")
+STAGES = ("clean_summary", "get_extractive_summary", "get_abstractive_summary", "speech_to_text", "fetch_translated_text")
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (list): The values.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize_latencies(latencies, units=None):
+    """
+    Returns:
+        dict: p50, p95, mean and max latency, and throughput in calls (and units) per second.
+    """
+    total = sum(latencies)
+    result = {
+        "runs": len(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "mean": statistics.mean(latencies),
+        "max": max(latencies),
+        "calls_per_second": len(latencies) / total if total else None,
+    }
+    if units is not None and total:
+        result["units_per_second"] = units * len(latencies) / total
+    return result
+
+
+def load_fixture_text():
+    """
+    Returns:
+        str: All recorded transcripts in benchmarks/fixtures, joined.
+    """
+    texts = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.txt"))):
+        with open(path) as f:
+            texts.append(f.read().strip())
+    return " ".join(texts)
+
+
+def sized_text(corpus, size):
+    """
+    Build an input of about size characters from the corpus, ending at a sentence boundary.
+    """
+    text = corpus
+    while len(text) < size:
+        text += " " + corpus
+    cut = text.rfind(". ", 0, size)
+    return text[:cut + 1] if cut > 0 else text[:size]
+
+
+def measure(func, repeats, warmup=1):
+    """
+    Time func() repeats times after warmup untimed calls.
+
+    Returns:
+        list: The latencies in seconds.
+    """
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run(stages, sizes, repeats, summary_model, asr_model):
+    # Chosen through the environment so that inference workers (INFERENCE_WORKERS) use them too
+    os.environ["SUMMARY_MODEL_1"] = summary_model
+    os.environ["ASR_MODEL"] = asr_model
+    from benchmarks.stubs import LocalTranslationBackend
+    import features
+    import summarize
+
+    features.set_translation_backend(LocalTranslationBackend())
+    corpus = load_fixture_text()
+    results = []
+
+    text_stages = {
+        "clean_summary": summarize.clean_summary,
+        "get_extractive_summary": summarize.get_extractive_summary,
+        "get_abstractive_summary": lambda text: summarize.get_abstractive_summary(text, 1, sla_seconds=float("inf")),
+        "fetch_translated_text": lambda text: features.fetch_translated_text(text, "French"),
+    }
+    for stage in stages:
+        if stage == "speech_to_text":
+            continue
+        for size in sizes:
+            text = sized_text(corpus, size)
+            latencies = measure(lambda: text_stages[stage](text), repeats)
+            result = {"stage": stage, "input_chars": len(text), **summarize_latencies(latencies, len(text))}
+            results.append(result)
+            print(f"{stage:26} {len(text):7d} chars  p50 {result['p50']:8.3f}s  p95 {result['p95']:8.3f}s  "
+                  f"{result['units_per_second']:10.0f} chars/s")
+
+    if "speech_to_text" in stages:
+        import transcription
+        from audio import SAMPLE_RATE, load_audio
+
+        audio_seconds = len(load_audio(AUDIO_SAMPLE)) / SAMPLE_RATE
+        previous = os.getcwd()
+        work_dir = tempfile.mkdtemp()
+        try:
+            # speech_to_text reads uploads from audio_file0.mp3 in the working directory
+            shutil.copy(AUDIO_SAMPLE, os.path.join(work_dir, "audio_file0.mp3"))
+            os.chdir(work_dir)
+            latencies = measure(lambda: transcription.speech_to_text("", True), repeats)
+        finally:
+            os.chdir(previous)
+            shutil.rmtree(work_dir, ignore_errors=True)
+        result = {"stage": "speech_to_text", "audio_seconds": audio_seconds, **summarize_latencies(latencies, audio_seconds)}
+        results.append(result)
+        print(f"{'speech_to_text':26} {audio_seconds:7.1f} s audio  p50 {result['p50']:8.3f}s  p95 {result['p95']:8.3f}s  "
+              f"{result['units_per_second']:8.2f}x real time")
+    return results
+
+
+def compare(results, baseline_path):
+    """
+    Print the p50 latency change of each benchmark against a previous run.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda result: (result["stage"], result.get("input_chars"), result.get("audio_seconds"))
+    previous = {key(result): result for result in baseline["results"]}
+    print(f"\nchange against {baseline_path} (p50):")
+    for result in results:
+        before = previous.get(key(result))
+        if before:
+            change = (result["p50"] - before["p50"]) / before["p50"] * 100
+            print(f"  {result['stage']:26} {result.get('input_chars') or '':>7}  {before['p50']:8.3f}s -> {result['p50']:8.3f}s  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--summary-model", default="t5-small")
+    parser.add_argument("--asr-model", default="tiny")
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    results = run(args.stages, args.sizes, args.repeats, args.summary_model, args.asr_model)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "summary_model": args.summary_model,
+                "asr_model": args.asr_model,
+                "results": results,
+            }, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Text similarity scores used by the benchmarks to compare an optimized
+backend's output against the reference output.
+"""
+import re
+from collections import Counter
+
+_WORD = re.compile(r"\w+")
+
+
+def _tokens(text):
+    return _WORD.findall(text.lower())
+
+
+def _f1(overlap, candidate_count, reference_count):
+    if not overlap or not candidate_count or not reference_count:
+        return 0.0
+    precision = overlap / candidate_count
+    recall = overlap / reference_count
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n=1):
+    """
+    ROUGE-N F1 score of candidate against reference.
+
+    Args:
+        candidate (str): The text to score.
+        reference (str): The reference text.
+        n (int): The n-gram size.
+
+    Returns:
+        float: The F1 score between 0 and 1.
+    """
+    def ngrams(tokens):
+        return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+    candidate_ngrams = ngrams(_tokens(candidate))
+    reference_ngrams = ngrams(_tokens(reference))
+    overlap = sum((candidate_ngrams & reference_ngrams).values())
+    return _f1(overlap, sum(candidate_ngrams.values()), sum(reference_ngrams.values()))
+
+
+def rouge_l(candidate, reference):
+    """
+    ROUGE-L F1 score (longest common subsequence) of candidate against reference.
+
+    Args:
+        candidate (str): The text to score.
+        reference (str): The reference text.
+
+    Returns:
+        float: The F1 score between 0 and 1.
+    """
+    a, b = _tokens(candidate), _tokens(reference)
+    previous = [0] * (len(b) + 1)
+    for token in a:
+        current = [0]
+        for j, other in enumerate(b):
+            current.append(previous[j] + 1 if token == other else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(a), len(b))
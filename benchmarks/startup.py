@@ -0,0 +1,79 @@
+"""
+Measure how long a fresh interpreter takes to import the pipeline modules.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--module main] [--budget 1.0]
+
+Each run imports the module in a new process, so nothing is shared between
+runs. The script exits with status 1 when the median exceeds the budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module):
+    """
+    Import the module in a new interpreter.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        float: The wall-clock time of the import, in seconds.
+    """
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return time.perf_counter() - started
+
+
+def slowest_imports(module, limit=10):
+    """
+    Report the imports that contribute most to the startup time of a module.
+
+    Args:
+        module (str): The module to import.
+        limit (int): The number of imports to report.
+
+    Returns:
+        list: (cumulative microseconds, module name) pairs, slowest first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget", type=float, default=1.0, help="maximum median import time in seconds")
+    args = parser.parse_args()
+
+    timings = [time_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s over {args.runs} runs")
+    print("slowest imports (cumulative):")
+    for cumulative, name in slowest_imports(args.module):
+        print(f"  {cumulative / 1e6:8.3f}s  {name}")
+
+    if median > args.budget:
+        print(f"median import time exceeds the {args.budget:.2f}s budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Local stand-ins for the network services used by the pipeline, so that
+benchmarks and load tests measure our own code without calling Google.
+"""
+import time
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, about 26 ms of audio)
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+
+class LocalTranslationBackend:
+    """
+    Translation backend that returns the text unchanged after a simulated round trip.
+
+    Args:
+        latency (float): Seconds per request.
+        seconds_per_char (float): Additional seconds per character.
+    """
+
+    def __init__(self, latency=0.05, seconds_per_char=0.00001):
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+
+    def translate(self, text, lang_code):
+        time.sleep(self.latency + self.seconds_per_char * len(text))
+        return text
+
+
+class LocalTTSBackend:
+    """
+    Text-to-speech backend that returns silent MP3 frames after a simulated round trip.
+
+    Args:
+        latency (float): Seconds per request.
+        seconds_per_char (float): Additional seconds per character.
+    """
+
+    def __init__(self, latency=0.1, seconds_per_char=0.0005):
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text, lang_code):
+        time.sleep(self.latency + self.seconds_per_char * len(text))
+        # Roughly 15 characters of speech per second of audio
+        return SILENT_MP3_FRAME * max(1, int(len(text) / 15 / 0.026))
+
+
+class LocalTranscript:
+    """
+    Caption track returned by LocalCaptionSource, shaped like youtube_transcript_api's Transcript.
+    """
+
+    language_code = "en"
+
+    def __init__(self, text, latency, seconds_per_segment=4.0):
+        self.text = text
+        self.latency = latency
+        self.seconds_per_segment = seconds_per_segment
+
+    def fetch(self):
+        time.sleep(self.latency)
+        words = self.text.split()
+        return [
+            {"text": " ".join(words[i:i + 10]), "start": i / 10 * self.seconds_per_segment,
+             "duration": self.seconds_per_segment}
+            for i in range(0, len(words), 10)
+        ]
+
+
+class LocalCaptionSource:
+    """
+    Caption source (see transcription.set_caption_source) that serves manual
+    English captions for every video ID from local text.
+
+    Args:
+        text (str): The caption text served for every video.
+        latency (float): Seconds per request, applied to listing and fetching.
+    """
+
+    def __init__(self, text, latency=0.1):
+        self.text = text
+        self.latency = latency
+
+    def list_transcripts(self, video_id):
+        time.sleep(self.latency)
+        return self
+
+    def find_manually_created_transcript(self, language_codes):
+        return LocalTranscript(self.text, self.latency)
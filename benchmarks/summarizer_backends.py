@@ -0,0 +1,115 @@
+"""
+Compare the summarization inference backends on a fixed sample.
+
+Usage:
+    python benchmarks/summarizer_backends.py [--models 1 2] [--backends torch int8 onnx]
+                                             [--sample benchmarks/fixtures/nvidia_gpu.txt]
+                                             [--output results.json]
+
+Every model/backend pair runs in its own process so that load time and peak
+resident memory are measured in isolation. Each backend's summaries are
+scored with ROUGE against the FP32 ("torch") output of the same model.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.quality import rouge_l, rouge_n
+
+DEFAULT_SAMPLE = os.path.join(ROOT, "benchmarks", "fixtures", "nvidia_gpu.txt")
+
+
+def run_backend(model_name, backend, sample_path, repeats):
+    """
+    Summarize the sample with one model/backend pair in the current process.
+
+    Returns:
+        dict: Load time, per-chunk latencies, peak RSS and the generated summaries.
+    """
+    from model_backends import load_summarizer
+    from routing import plan_generation
+
+    with open(sample_path) as f:
+        text = f.read()
+    # The chunking and generation settings the routing policy uses without a latency limit
+    plan = plan_generation(text, sla_seconds=float("inf"), model_name=model_name)
+
+    started = time.perf_counter()
+    generator = load_summarizer(model_name, backend)
+    load_seconds = time.perf_counter() - started
+
+    latencies, summaries = [], []
+    for repeat in range(repeats):
+        for chunk in plan.chunks:
+            started = time.perf_counter()
+            summary = generator(chunk, **plan.generate_kwargs())[0]["summary_text"]
+            latencies.append(time.perf_counter() - started)
+            if repeat == 0:
+                summaries.append(summary)
+
+    return {
+        "model": model_name,
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "chunk_latency_p50": statistics.median(latencies),
+        "chunk_latency_mean": statistics.mean(latencies),
+        "chunks_per_second": len(latencies) / sum(latencies),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "summary": " ".join(summaries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--sample", default=DEFAULT_SAMPLE)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output")
+    parser.add_argument("--worker", nargs=2, metavar=("MODEL", "BACKEND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker[0], args.worker[1], args.sample, args.repeats)))
+        return
+
+    from model_backends import SUMMARY_MODELS
+
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    results = []
+    for choice in args.models:
+        model_name = SUMMARY_MODELS[choice]
+        reference = None
+        for backend in backends:
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", model_name, backend,
+                 "--sample", args.sample, "--repeats", str(args.repeats)],
+                cwd=ROOT, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            if reference is None:
+                reference = result["summary"]
+            result["rouge1_vs_fp32"] = rouge_n(result["summary"], reference, 1)
+            result["rouge2_vs_fp32"] = rouge_n(result["summary"], reference, 2)
+            result["rougeL_vs_fp32"] = rouge_l(result["summary"], reference)
+            results.append(result)
+            print(f"{model_name:32} {backend:6} load {result['load_seconds']:6.1f}s  "
+                  f"p50/chunk {result['chunk_latency_p50']:6.2f}s  rss {result['peak_rss_mb']:7.0f} MB  "
+                  f"ROUGE-L {result['rougeL_vs_fp32']:.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
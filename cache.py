@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def content_key(*parts):
+    """
+    Build a content-addressed cache key from the given parts.
+
+    Args:
+        *parts: Values identifying the cached content, e.g. text and settings.
+
+    Returns:
+        str: A SHA-256 hex digest of the parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = str(part).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its values.
+
+    Args:
+        max_size (int): The maximum total size of the cached values.
+        sizeof (callable): Returns the size of a value. Defaults to len.
+    """
+
+    def __init__(self, max_size, sizeof=len):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value cached under key and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+            default: Returned when the key is not cached.
+
+        Returns:
+            The cached value, or default.
+        """
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        """
+        Cache value under key, evicting least recently used entries to stay within max_size.
+        Values larger than max_size are not cached.
+
+        Args:
+            key (str): The cache key.
+            value: The value to cache.
+        """
+        value_size = self.sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self.size -= self.sizeof(self._items.pop(key))
+            if value_size > self.max_size:
+                return
+            self._items[key] = value
+            self.size += value_size
+            while self.size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class ResultCache:
+    """
+    Persistent cache of pipeline results, one JSON file per entry.
+
+    Entries survive restarts and are shared by every process using the same
+    directory, so results precomputed by the ingest worker (see ingest.py)
+    are served to the app without recomputation. Reads mark an entry as
+    recently used, and every prune_interval writes the least recently used
+    entries are deleted until the directory fits in max_bytes.
+
+    Args:
+        directory (str): Where the entries are stored.
+        max_bytes (int): The size limit of the directory, 0 to disable the cache.
+        prune_interval (int): Writes between size checks.
+    """
+
+    def __init__(self, directory, max_bytes, prune_interval=100):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, content_key(*key) + ".json")
+
+    def get(self, key, default=None):
+        """
+        Return the result stored under key.
+
+        Args:
+            key (tuple): The parts identifying the result, e.g. ("transcript", video ID).
+            default: Returned when nothing is stored under key.
+
+        Returns:
+            The stored result, or default.
+        """
+        if self.max_bytes <= 0:
+            return default
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store a JSON-serializable result under key. The file is replaced
+        atomically, so concurrent readers never see a partial entry.
+
+        Args:
+            key (tuple): The parts identifying the result.
+            value: The result.
+        """
+        if self.max_bytes <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_interval == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Delete the least recently used entries until the directory fits in max_bytes.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import Future
+
+from metrics import cache_event
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent identical calls.
+
+    While a call for a key is in progress, further calls with the same key
+    wait for it and receive its result (or exception) instead of running the
+    work again. Once the call finishes the key is forgotten, so later calls
+    run afresh.
+
+    Args:
+        name (str): Name used for the hit/miss counters in the metrics.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) unless a call with the same key is already in flight.
+
+        Args:
+            key: A hashable key identifying the work, e.g. (operation, video ID, parameters).
+            func (callable): The work to run.
+
+        Returns:
+            The result of the call, shared between all callers with the same key.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        cache_event(self.name, not leader)
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        """
+        Returns:
+            int: The number of keys currently being computed.
+        """
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,338 @@
+import contextlib
+import glob
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from coalesce import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Streamlit serves files under ./static at app/static/ (server.enableStaticServing),
+# streaming them from disk instead of holding them in the session.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+MEDIA_DIR = os.path.join(STATIC_DIR, "media")
+# Upper bound on the total size of cached videos and clips
+MEDIA_CACHE_BYTES = int(os.environ.get("MEDIA_CACHE_BYTES", str(5 * 1024 ** 3)))
+# Streamlit's static handler answers 404 for files over 200 MB (MAX_APP_STATIC_FILE_SIZE);
+# larger files are streamed by the media server, see start_media_server
+STATIC_FILE_LIMIT = 200 * 1024 * 1024
+MEDIA_PORT = int(os.environ.get("MEDIA_PORT", "8503"))
+# Where browsers reach the media server, e.g. a path routed to it by a reverse proxy
+MEDIA_BASE_URL = os.environ.get("MEDIA_BASE_URL", f"http://localhost:{MEDIA_PORT}")
+MEDIA_CHUNK_SIZE = 1024 * 1024
+
+_YTDLP_FORMAT = "(bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best)"
+
+_downloads = SingleFlight("download_inflight")
+_clips = SingleFlight("clip_inflight")
+# Media files ffmpeg is reading, which prune_media_cache must not delete
+_in_use = Counter()
+_in_use_lock = threading.Lock()
+
+
+def parse_timestamp(value):
+    """
+    Converts a time in HH:MM:SS, MM:SS or seconds to seconds.
+
+    Args:
+        value (str): The time to convert.
+
+    Returns:
+        float: The time in seconds.
+
+    Raises:
+        ValueError: If the value is not a valid time.
+    """
+    parts = value.strip().split(":")
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"Invalid time {value!r}, expected HH:MM:SS")
+    seconds = 0.0
+    for part in parts:
+        number = float(part)
+        if number < 0:
+            raise ValueError(f"Invalid time {value!r}, expected HH:MM:SS")
+        seconds = seconds * 60 + number
+    return seconds
+
+
+def source_path(video_id):
+    """
+    Returns:
+        str: Where the full video is cached.
+    """
+    return os.path.join(MEDIA_DIR, f"{video_id}.mp4")
+
+
+def media_url(path, filename=None):
+    """
+    Files up to STATIC_FILE_LIMIT are served by Streamlit's static file
+    handler, larger ones by the media server, which is started on first use.
+
+    Args:
+        path (str): The cached media file.
+        filename (str): The file name browsers save the download as.
+
+    Returns:
+        str: The URL under which a cached media file is served.
+    """
+    if os.path.getsize(path) <= STATIC_FILE_LIMIT:
+        return "app/static/" + quote(os.path.relpath(path, STATIC_DIR).replace(os.sep, "/"))
+    start_media_server()
+    url = f"{MEDIA_BASE_URL}/media/{quote(os.path.basename(path))}"
+    # The download attribute of a link is ignored across origins, so the server sets the name
+    return url + (f"?name={quote(filename)}" if filename else "")
+
+
+def _byte_range(header, size):
+    """
+    Parse a single "bytes=start-end" Range header.
+
+    Returns:
+        tuple: The first and last byte, or None if the header is missing or not satisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].partition("-")
+    try:
+        if not start:
+            first, last = max(size - int(end), 0), size - 1
+        else:
+            first, last = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    return (first, last) if first <= last else None
+
+
+_media_server = None
+_media_server_lock = threading.Lock()
+
+
+def start_media_server(port=MEDIA_PORT, host="0.0.0.0"):
+    """
+    Stream cached media files at /media/<name> from a background thread,
+    with HTTP range requests for seeking and resumed downloads. Calling it
+    again once the server is running has no effect.
+
+    Args:
+        port (int): The port to listen on.
+        host (str): The address to bind to.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MediaHandler(BaseHTTPRequestHandler):
+
+        def do_HEAD(self):
+            self._serve(body=False)
+
+        def do_GET(self):
+            self._serve(body=True)
+
+        def _serve(self, body):
+            url = urlsplit(self.path)
+            name = unquote(url.path[len("/media/"):]) if url.path.startswith("/media/") else ""
+            if not name.endswith(".mp4") or os.path.basename(name) != name:
+                self.send_error(404)
+                return
+            try:
+                f = open(os.path.join(MEDIA_DIR, name), "rb")
+            except FileNotFoundError:
+                self.send_error(404)
+                return
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                requested = self.headers.get("Range")
+                byte_range = _byte_range(requested, size)
+                if requested and byte_range is None:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.end_headers()
+                    return
+                first, last = byte_range or (0, size - 1)
+                self.send_response(206 if byte_range else 200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(last - first + 1))
+                if byte_range:
+                    self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+                filename = parse_qs(url.query).get("name", [None])[0]
+                if filename:
+                    self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(filename)}")
+                self.end_headers()
+                if not body:
+                    return
+                f.seek(first)
+                remaining = last - first + 1
+                try:
+                    while remaining > 0:
+                        chunk = f.read(min(MEDIA_CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        self.wfile.write(chunk)
+                        remaining -= len(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The browser stopped the download or seeked elsewhere
+                    pass
+
+        def log_message(self, format, *args):
+            pass
+
+    global _media_server
+    with _media_server_lock:
+        if _media_server is not None:
+            return
+        _media_server = ThreadingHTTPServer((host, port), MediaHandler)
+    threading.Thread(target=_media_server.serve_forever, name="media-server", daemon=True).start()
+
+
+@contextlib.contextmanager
+def _using(path):
+    """
+    Keep path out of prune_media_cache while the enclosed code reads it.
+    """
+    with _in_use_lock:
+        _in_use[path] += 1
+    try:
+        yield
+    finally:
+        with _in_use_lock:
+            _in_use[path] -= 1
+            if not _in_use[path]:
+                del _in_use[path]
+
+
+def prune_media_cache(max_bytes=MEDIA_CACHE_BYTES, keep=()):
+    """
+    Delete the least recently used media files until the cache fits in max_bytes.
+
+    Args:
+        max_bytes (int): The size limit of the cache.
+        keep (tuple): Paths that must not be deleted, besides those in use.
+    """
+    with _in_use_lock:
+        keep = set(keep) | set(_in_use)
+    files = glob.glob(os.path.join(MEDIA_DIR, "*.mp4"))
+    files.sort(key=os.path.getatime)
+    total = sum(os.path.getsize(path) for path in files)
+    for path in files:
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        total -= os.path.getsize(path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def download_source(video_link, video_id):
+    """
+    Download the full video once and cache it by video ID.
+
+    pytube's highest resolution progressive stream is tried first and yt-dlp
+    is the fallback, run without a shell. Concurrent calls for the same video
+    share one download.
+
+    Args:
+        video_link (str): The link to the YouTube video.
+        video_id (str): The ID of the video.
+
+    Returns:
+        str: The path of the cached video.
+    """
+    return _downloads.do(video_id, _download_source, video_link, video_id)
+
+
+def _download_source(video_link, video_id):
+    path = source_path(video_id)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    # A directory of its own, so other processes downloading the same video don't collide
+    work_dir = tempfile.mkdtemp(dir=MEDIA_DIR, prefix=f"{video_id}.", suffix=".part")
+    partial = os.path.join(work_dir, f"{video_id}.mp4")
+    try:
+        try:
+            from pytube import YouTube
+
+            stream = YouTube(video_link).streams.get_highest_resolution()
+            stream.download(work_dir, os.path.basename(partial))
+        except Exception:
+            logger.warning("pytube video download failed, falling back to yt-dlp", exc_info=True)
+            import yt_dlp
+
+            options = {
+                "format": _YTDLP_FORMAT,
+                "merge_output_format": "mp4",
+                "outtmpl": partial,
+                "quiet": True,
+                "noprogress": True,
+            }
+            with yt_dlp.YoutubeDL(options) as ydl:
+                ydl.download([video_link])
+            # yt-dlp may append the container extension to the template
+            partial = next(iter(glob.glob(partial + "*")), partial)
+        os.replace(partial, path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    prune_media_cache(keep=(path,))
+    return path
+
+
+def cut_clip(video_link, video_id, start_time, end_time):
+    """
+    Cut a clip from the cached video with ffmpeg stream copy, downloading the
+    video first if it isn't cached. Clips are cached too.
+
+    Stream copy does not re-encode, so the clip starts at the keyframe at or
+    before start_time. Concurrent calls for the same clip share one cut.
+
+    Args:
+        video_link (str): The link to the YouTube video.
+        video_id (str): The ID of the video.
+        start_time (str): The start of the clip, HH:MM:SS.
+        end_time (str): The end of the clip, HH:MM:SS.
+
+    Returns:
+        str: The path of the clip.
+
+    Raises:
+        ValueError: If the times are invalid.
+    """
+    start, end = parse_timestamp(start_time), parse_timestamp(end_time)
+    if end <= start:
+        raise ValueError("The end time must be after the start time")
+
+    path = os.path.join(MEDIA_DIR, f"{video_id}-{start:g}-{end:g}.mp4")
+    return _clips.do(path, _cut_clip, video_link, video_id, start, end, path)
+
+
+def _cut_clip(video_link, video_id, start, end, path):
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    with _using(source_path(video_id)):
+        source = download_source(video_link, video_id)
+        fd, partial = tempfile.mkstemp(dir=MEDIA_DIR, prefix=os.path.basename(path) + ".", suffix=".part")
+        os.close(fd)
+        command = [
+            "ffmpeg", "-nostdin", "-y", "-ss", f"{start:.3f}", "-i", source, "-t", f"{end - start:.3f}",
+            "-c", "copy", "-avoid_negative_ts", "make_zero", "-movflags", "+faststart", "-f", "mp4", partial,
+        ]
+        try:
+            subprocess.run(command, capture_output=True, check=True)
+            os.replace(partial, path)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to cut clip: {e.stderr.decode(errors='ignore')}") from e
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial)
+        prune_media_cache(keep=(source, path))
+    return path
@@ -0,0 +1,49 @@
+class PipelineError(Exception):
+    """
+    A pipeline stage failed. The message is meant to be shown to the user.
+
+    Stages raise these instead of returning an error message, so a failure
+    stops the pipeline before any later (and more expensive) stage runs.
+    """
+
+
+class InvalidLinkError(PipelineError, ValueError):
+    """
+    The link is not a YouTube video link.
+    """
+
+
+class VideoNotFoundError(PipelineError):
+    """
+    The video doesn't exist or isn't available.
+    """
+
+
+class TranscriptionError(PipelineError):
+    """
+    Neither captions nor speech recognition produced a transcript.
+    """
+
+
+class SummarizationError(PipelineError):
+    """
+    The summarization model failed.
+    """
+
+
+class TranslationError(PipelineError):
+    """
+    The translation service failed.
+    """
+
+
+class SpeechSynthesisError(PipelineError):
+    """
+    Generating the audible summary failed.
+    """
+
+
+class VideoDataError(PipelineError):
+    """
+    Fetching the video's metadata failed.
+    """
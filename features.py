@@ -1,11 +1,161 @@
-import os
-from googletrans import Translator,LANGCODES
-from gtts import gTTS
-from pytube import YouTube
+import io
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cache import LRUCache, content_key
+from metrics import cache_event, record, stage, traced
+
+# Maximum characters per request for each backend
+TRANSLATE_CHUNK_SIZE = 5000
+TTS_CHUNK_SIZE = 500
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Upper bound on the total size of cached audible summaries
+AUDIO_CACHE_BYTES = 64 * 1024 * 1024
+
+TRANSLATE_WORKERS = 4
+TTS_WORKERS = 4
+REQUEST_RETRIES = 3
+REQUEST_BACKOFF = 0.5
+
+
+class GoogleTranslateBackend:
+    """
+    Translation backend backed by the googletrans client.
+
+    A single Translator (and therefore a single HTTP session) is created
+    lazily and reused for every chunk instead of building a new one per call.
+    """
+
+    def __init__(self):
+        self._translator = None
+        self._lock = threading.Lock()
+
+    def translate(self, text, lang_code):
+        """
+        Translate a single chunk of text.
+
+        Args:
+            text (str): The chunk to be translated.
+            lang_code (str): The language code of the target language.
+
+        Returns:
+            str: The translated chunk.
+        """
+        with self._lock:
+            if self._translator is None:
+                from googletrans import Translator
+                self._translator = Translator()
+        return self._translator.translate(text, dest=lang_code).text
+
+
+class GTTSBackend:
+    """
+    Text-to-speech backend backed by gTTS.
+    """
+
+    def __init__(self, slow=False):
+        self.slow = slow
+
+    def synthesize(self, text, lang_code):
+        """
+        Synthesize a single chunk of text.
+
+        Args:
+            text (str): The chunk to be spoken.
+            lang_code (str): The language code of the speech.
+
+        Returns:
+            bytes: MP3 frames of the spoken chunk.
+        """
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang_code, slow=self.slow).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+_translation_backend = GoogleTranslateBackend()
+_tts_backend = GTTSBackend()
+audio_cache = LRUCache(AUDIO_CACHE_BYTES)
+
+
+def set_translation_backend(backend):
+    """
+    Replace the backend used by translate_text.
+
+    Any object with a ``translate(text, lang_code) -> str`` method can be used,
+    e.g. a local offline translation model or a stub in tests.
+
+    Args:
+        backend: The translation backend to use.
+
+    Returns:
+        The previously installed backend.
+    """
+    global _translation_backend
+    previous = _translation_backend
+    _translation_backend = backend
+    return previous
+
+
+def get_translation_backend():
+    """
+    Returns:
+        The translation backend currently used by translate_text.
+    """
+    return _translation_backend
+
+
+def set_tts_backend(backend):
+    """
+    Replace the backend used by ttspeech.
+
+    Any object with a ``synthesize(text, lang_code) -> bytes`` method returning
+    MP3 frames can be used, e.g. a local offline TTS engine or a stub in tests.
+
+    Args:
+        backend: The text-to-speech backend to use.
+
+    Returns:
+        The previously installed backend.
+    """
+    global _tts_backend
+    previous = _tts_backend
+    _tts_backend = backend
+    return previous
+
+
+def get_tts_backend():
+    """
+    Returns:
+        The text-to-speech backend currently used by ttspeech.
+    """
+    return _tts_backend
+
+
+def _with_retries(func, *args):
+    """
+    Call func(*args), retrying with exponential backoff on failure.
+    """
+    for attempt in range(REQUEST_RETRIES):
+        try:
+            return func(*args)
+        except Exception:
+            if attempt == REQUEST_RETRIES - 1:
+                raise
+            time.sleep(REQUEST_BACKOFF * (2 ** attempt))
+
 
 def translate_text(text,lang_code):
     """
-    Translate the input text to the specified language using Google Translate API.
+    Translate the input text to the specified language using the configured translation backend.
+
+    Chunks are translated concurrently by a bounded pool of workers and yielded
+    in their original order.
 
     Args:
         text (str): The text to be translated.
@@ -15,26 +165,100 @@ def translate_text(text,lang_code):
         str: The translated text.
 
     """
-    
-    for chunk in create_chunks(text):
-        translated_chunk = Translator().translate(chunk, dest=lang_code)
-        yield translated_chunk.text
+    backend = _translation_backend
+    chunks = list(create_chunks(text, TRANSLATE_CHUNK_SIZE))
+    if len(chunks) <= 1:
+        for chunk in chunks:
+            yield _with_retries(backend.translate, chunk, lang_code)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(TRANSLATE_WORKERS, len(chunks))) as executor:
+        futures = [executor.submit(_with_retries, backend.translate, chunk, lang_code) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+
+def split_sentences(text):
+    """
+    Split text into sentences on terminal punctuation followed by whitespace.
+
+    Args:
+        text (str): The input text.
+
+    Returns:
+        list: The sentences of the text, without surrounding whitespace.
+    """
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
 
-def create_chunks(text):
+def _split_words(text, chunk_size):
     """
-    Break the input text into chunks of the specified size.
+    Split an over-long sentence at word boundaries into pieces of at most chunk_size characters.
+    Words longer than chunk_size are split hard as a last resort.
+    """
+    pieces, current = [], ""
+    for word in text.split():
+        while len(word) > chunk_size:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:chunk_size])
+            word = word[chunk_size:]
+        if not current:
+            current = word
+        elif len(current) + 1 + len(word) <= chunk_size:
+            current += " " + word
+        else:
+            pieces.append(current)
+            current = word
+    if current:
+        pieces.append(current)
+    return pieces
+
+def create_chunks(text, chunk_size=TRANSLATE_CHUNK_SIZE):
+    """
+    Break the input text into chunks that respect sentence and word boundaries.
+
+    Whole sentences are packed into each chunk, aiming for chunks of roughly
+    equal size so that they can be processed in parallel. A sentence is only
+    split, at word boundaries, when it alone exceeds chunk_size.
 
     Args:
         text (str): The input text to be split.
-        chunk_size (int): The maximum size of each chunk. Defaults to 10000.
+        chunk_size (int): The maximum size of each chunk. Defaults to TRANSLATE_CHUNK_SIZE.
 
     Yields:
         str: A chunk of the input text.
 
     """
-    for i in range(0, len(text), 10000):
-        yield text[i:i+10000]
+    text = text.strip()
+    if not text:
+        return
+    if len(text) <= chunk_size:
+        yield text
+        return
+
+    pieces = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= chunk_size:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_split_words(sentence, chunk_size))
+
+    # Aim for evenly sized chunks rather than filling each one up to the limit
+    chunk_count = math.ceil(len(text) / chunk_size)
+    target = math.ceil(len(text) / chunk_count)
 
+    current, length = [], 0
+    for piece in pieces:
+        added = len(piece) + (1 if current else 0)
+        if current and (length + added > chunk_size or length >= target):
+            yield " ".join(current)
+            current, length, added = [], 0, len(piece)
+        current.append(piece)
+        length += added
+    if current:
+        yield " ".join(current)
+
+@traced("fetch_translated_text")
 def fetch_translated_text(text,lang_choice):
     """
     Fetch the translated text for the given input text and target language.
@@ -47,33 +271,87 @@ def fetch_translated_text(text,lang_choice):
         str: The translated text.
 
     """    
-    translated_result=""
-    for translated_chunk in translate_text(text, LANGCODES[lang_choice.lower()]):
-        translated_result=translated_result+(translated_chunk)
-    return translated_result
+    record(chars=len(text))
+    return " ".join(translate_text(text, get_lang_code(lang_choice)))
+
+
+def get_lang_code(language):
+    """
+    Look up the language code for a language name, e.g. "French" -> "fr".
+
+    Args:
+        language (str): The name of the language.
 
+    Returns:
+        str: The language code.
+    """
+    from googletrans import LANGCODES
+    return LANGCODES[language.lower()]
+
+def _voice_settings(backend):
+    """
+    Describe a text-to-speech backend and its settings for use in cache keys.
+    """
+    settings = sorted((key, repr(value)) for key, value in vars(backend).items() if not key.startswith("_"))
+    return f"{type(backend).__name__}{settings}"
 
-def ttspeech(text: str, language: str) -> None:
+def iter_speech(text, language):
     """
-    Converts the given text into speech and saves it as an mp3 file.
+    Synthesize speech for the given text chunk by chunk.
+
+    Sentence-aligned chunks are synthesized concurrently and their MP3 frames
+    are yielded in order as soon as each one is ready, so playback of the first
+    chunk can start while later chunks are still being generated.
+
+    Finished audio is kept in audio_cache, keyed by the text, language and
+    voice settings, so repeated requests are served from memory in one piece.
 
     Args:
         text (str): Text to be converted into speech.
         language (str): Language of the text.
 
-    Returns:
-        None
+    Yields:
+        bytes: MP3 frames of the next chunk.
     """
+    with stage("ttspeech", current=False) as span:
+        span.set(chars=len(text))
+        backend = _tts_backend
+        code = get_lang_code(language)
+        key = content_key(text, code, _voice_settings(backend))
+        cached = audio_cache.get(key)
+        cache_event("tts_audio", cached is not None)
+        if cached is not None:
+            yield cached
+            return
 
-    # Creating the speech using the gTTS library
-    speech = gTTS(text=text, lang=LANGCODES[language.lower()], slow=False)
+        chunks = list(create_chunks(text, TTS_CHUNK_SIZE))
+        if not chunks:
+            return
+
+        audio = io.BytesIO()
+        with ThreadPoolExecutor(max_workers=min(TTS_WORKERS, len(chunks))) as executor:
+            futures = [executor.submit(_with_retries, backend.synthesize, chunk, code) for chunk in chunks]
+            for future in futures:
+                frames = future.result()
+                audio.write(frames)
+                yield frames
+        audio_cache.put(key, audio.getvalue())
+
+def ttspeech(text: str, language: str) -> bytes:
+    """
+    Converts the given text into speech.
 
-    # Defining the file name and path to save the speech as mp3 file
-    file_name = "savedaudiofile.mp3"
-    file_path = os.path.join(os.path.dirname(__file__), file_name)
+    Args:
+        text (str): Text to be converted into speech.
+        language (str): Language of the text.
 
-    # Saving the speech as an mp3 file
-    speech.save(file_path)
+    Returns:
+        bytes: The speech as MP3 data, assembled in memory.
+    """
+    audio = io.BytesIO()
+    for frames in iter_speech(text, language):
+        audio.write(frames)
+    return audio.getvalue()
 
 def vid_duration(duration):
     """
@@ -99,6 +377,8 @@ def get_vid_data(link):
     Returns:
         A dictionary containing the video data.
     """
+    from pytube import YouTube
+
     yt = YouTube(link)
 
     # Collecting relevant data from the video
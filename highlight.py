@@ -0,0 +1,113 @@
+import functools
+import html
+import math
+import re
+
+# Length of the word sequences that must match to be highlighted
+NGRAM_SIZE = 3
+# Words of the transcript rendered per page
+PAGE_WORDS = 600
+
+_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+def _normalize(word):
+    return _PUNCTUATION.sub("", word.lower())
+
+
+def _runs(marked):
+    """
+    Collapse a per-word flag list into (start, end) ranges of consecutive flagged words.
+    """
+    runs, start = [], None
+    for position, flag in enumerate(marked):
+        if flag and start is None:
+            start = position
+        elif not flag and start is not None:
+            runs.append((start, position))
+            start = None
+    if start is not None:
+        runs.append((start, len(marked)))
+    return tuple(runs)
+
+
+@functools.lru_cache(maxsize=32)
+def align(summary, transcript, n=NGRAM_SIZE):
+    """
+    Find the passages that the summary and the transcript have in common.
+
+    A word is highlighted when it is part of a sequence of n words that
+    occurs in both texts (compared case- and punctuation-insensitively).
+    Results are cached per summary and transcript, so Streamlit reruns reuse them.
+
+    Args:
+        summary (str): The summary.
+        transcript (str): The transcript.
+        n (int): The length of the matching word sequences.
+
+    Returns:
+        tuple: The summary words, the highlighted (start, end) word ranges of
+        the summary, the transcript words and the highlighted ranges of the transcript.
+    """
+    summary_words, transcript_words = tuple(summary.split()), tuple(transcript.split())
+    summary_norm = [_normalize(word) for word in summary_words]
+    transcript_norm = [_normalize(word) for word in transcript_words]
+    n = max(1, min(n, len(summary_norm), len(transcript_norm)))
+
+    summary_grams = {}
+    for i in range(len(summary_norm) - n + 1):
+        summary_grams.setdefault(tuple(summary_norm[i:i + n]), []).append(i)
+
+    summary_marked = [False] * len(summary_words)
+    transcript_marked = [False] * len(transcript_words)
+    for i in range(len(transcript_norm) - n + 1):
+        positions = summary_grams.get(tuple(transcript_norm[i:i + n]))
+        if positions is None:
+            continue
+        transcript_marked[i:i + n] = [True] * n
+        for position in positions:
+            summary_marked[position:position + n] = [True] * n
+
+    return summary_words, _runs(summary_marked), transcript_words, _runs(transcript_marked)
+
+
+def page_count(words, page_words=PAGE_WORDS):
+    """
+    Returns:
+        int: The number of pages needed to render the words.
+    """
+    return max(1, math.ceil(len(words) / page_words))
+
+
+def render(words, runs, page=1, page_words=None):
+    """
+    Render words as HTML with the highlighted ranges wrapped in one span each.
+
+    Args:
+        words (tuple): The words, as returned by align.
+        runs (tuple): The highlighted (start, end) word ranges.
+        page (int): The page to render, starting at 1.
+        page_words (int): Words per page, or None to render everything.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    start, end = 0, len(words)
+    if page_words:
+        start = (page - 1) * page_words
+        end = min(start + page_words, len(words))
+
+    parts, position = [], start
+    for run_start, run_end in runs:
+        if run_end <= start:
+            continue
+        if run_start >= end:
+            break
+        run_start, run_end = max(run_start, start), min(run_end, end)
+        if position < run_start:
+            parts.append(html.escape(" ".join(words[position:run_start])))
+        parts.append('<span class="highlight">{}</span>'.format(html.escape(" ".join(words[run_start:run_end]))))
+        position = run_end
+    if position < end:
+        parts.append(html.escape(" ".join(words[position:end])))
+    return " ".join(parts)
@@ -0,0 +1,259 @@
+"""
+Precompute transcripts and summaries for watched channels and playlists.
+
+The worker discovers new uploads of each source, fetches their transcripts
+and summarizes them into the result cache shared with the app (see
+main.RESULT_CACHE_DIR), so on-demand requests for those videos are cache hits.
+It only works inside an off-peak window and within a CPU budget:
+
+    python ingest.py https://www.youtube.com/@channel "https://www.youtube.com/playlist?list=..." \
+        --window 01:00-06:00 --cpu-budget 0.5
+
+Videos already processed are remembered in INGEST_STATE_PATH and skipped.
+The results and video data are also kept in the archive (see archive.py).
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Video IDs already ingested, by source
+INGEST_STATE_PATH = os.environ.get(
+    "INGEST_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ingest_state.json"))
+# Newest uploads looked at per source and pass
+INGEST_MAX_VIDEOS = 20
+# Seconds between discovery passes
+INGEST_INTERVAL = 3600
+# Scheduling priority of the worker process, so interactive requests win
+INGEST_NICE = 10
+
+
+def parse_window(value):
+    """
+    Parse an "HH:MM-HH:MM" local time window, which may wrap around midnight.
+
+    Returns:
+        tuple: The start and end as datetime.time.
+    """
+    start, end = value.split("-")
+    return datetime.time.fromisoformat(start.strip()), datetime.time.fromisoformat(end.strip())
+
+
+def seconds_until_window(window, now=None):
+    """
+    Args:
+        window (tuple): The (start, end) times, or None for always.
+        now (datetime.datetime): The current local time.
+
+    Returns:
+        float: Seconds until the window opens, 0 inside the window.
+    """
+    if window is None:
+        return 0.0
+    start, end = window
+    now = now or datetime.datetime.now()
+    current = now.time()
+    inside = start <= current < end if start <= end else current >= start or current < end
+    if inside:
+        return 0.0
+    opens = datetime.datetime.combine(now.date(), start)
+    if opens <= now:
+        opens += datetime.timedelta(days=1)
+    return (opens - now).total_seconds()
+
+
+class CpuBudget:
+    """
+    Duty-cycle throttle: after each unit of work, sleep long enough that the
+    work takes at most the given fraction of wall time. The CPU used is at
+    most fraction times the number of threads the work runs on, see --threads.
+
+    Args:
+        fraction (float): The share of wall time the work may run, in (0, 1].
+    """
+
+    def __init__(self, fraction):
+        if not 0 < fraction <= 1:
+            raise ValueError(f"CPU budget must be in (0, 1], got {fraction}")
+        self.fraction = fraction
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs), then pause to stay within the budget.
+
+        Returns:
+            The result of the call.
+        """
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            busy = time.perf_counter() - started
+            time.sleep(busy * (1 / self.fraction - 1))
+
+
+def load_state(path=INGEST_STATE_PATH):
+    """
+    Returns:
+        dict: Source URL -> list of ingested video IDs.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state, path=INGEST_STATE_PATH):
+    """
+    Write the ingest state atomically.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def discover(source, limit=INGEST_MAX_VIDEOS):
+    """
+    List the newest uploads of a channel or playlist.
+
+    Args:
+        source (str): A channel or playlist URL.
+        limit (int): The maximum number of videos.
+
+    Returns:
+        list: Video URLs, newest first.
+    """
+    from pytube import Channel, Playlist
+
+    videos = Playlist(source) if "list=" in source else Channel(source)
+    urls = []
+    for url in videos.video_urls:
+        urls.append(url)
+        if len(urls) >= limit:
+            break
+    return urls
+
+
+def ingest_video(video_link, model_choices):
+    """
+    Compute the transcript, summaries and video data of a video into the result cache and the archive.
+
+    Args:
+        video_link (str): The video URL.
+        model_choices (list): The app model choices to summarize with.
+    """
+    import main
+
+    languages = []
+    transcript, manual_subtitles = main.get_transcript(video_link, on_language=languages.append)
+    for model_choice in model_choices:
+        main.summarize_transcript(transcript, model_choice, language=languages[0], video_link=video_link,
+                                  manual_subtitles=manual_subtitles)
+    main.get_data(video_link)
+
+
+def run_pass(sources, model_choices, budget, window=None, limit=INGEST_MAX_VIDEOS, state_path=INGEST_STATE_PATH):
+    """
+    Ingest the new uploads of every source once.
+
+    Stops early when the off-peak window closes; the remaining videos are
+    picked up by the next pass.
+
+    Returns:
+        int: The number of videos ingested.
+    """
+    from errors import PipelineError
+    from transcription import get_video_id
+
+    state = load_state(state_path)
+    ingested = 0
+    for source in sources:
+        seen = set(state.get(source, []))
+        try:
+            video_links = discover(source, limit)
+        except Exception:
+            logger.exception("Discovering uploads of %s failed", source)
+            continue
+        for video_link in video_links:
+            video_id = get_video_id(video_link)
+            if video_id in seen:
+                continue
+            if seconds_until_window(window) > 0:
+                logger.info("Off-peak window closed, stopping this pass")
+                return ingested
+            try:
+                budget.run(ingest_video, video_link, model_choices)
+            except PipelineError as e:
+                # Left unseen, so the video is retried in the next pass
+                logger.warning("Ingesting %s failed: %s", video_link, e)
+                continue
+            seen.add(video_id)
+            state[source] = sorted(seen)
+            save_state(state, state_path)
+            ingested += 1
+            logger.info("Ingested %s", video_link)
+    return ingested
+
+
+def _model_choice(value):
+    from routing import AUTO
+
+    return AUTO if value.lower() == AUTO.lower() else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="Channel or playlist URLs")
+    parser.add_argument("--sources-file", help="File with one channel or playlist URL per line")
+    parser.add_argument("--models", default="1", help="Comma-separated model choices to precompute, e.g. 1,2,Auto")
+    parser.add_argument("--window", type=parse_window, help="Off-peak local time window, e.g. 01:00-06:00")
+    parser.add_argument("--cpu-budget", type=float, default=0.5, help="Fraction of wall time spent working, in (0, 1]")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads used for inference")
+    parser.add_argument("--nice", type=int, default=INGEST_NICE, help="Scheduling priority increment")
+    parser.add_argument("--max-videos", type=int, default=INGEST_MAX_VIDEOS, help="Newest uploads looked at per source")
+    parser.add_argument("--interval", type=float, default=INGEST_INTERVAL, help="Seconds between passes")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sources = list(args.sources)
+    if args.sources_file:
+        with open(args.sources_file, encoding="utf-8") as f:
+            sources += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not sources:
+        parser.error("no channels or playlists given")
+    model_choices = [_model_choice(value) for value in args.models.split(",")]
+    budget = CpuBudget(args.cpu_budget)
+    if args.nice and hasattr(os, "nice"):
+        os.nice(args.nice)
+    # Bound the cores the work runs on, here and in any inference workers,
+    # so that the budget is a share of --threads cores
+    import workers
+
+    workers.TORCH_THREADS = args.threads
+    workers.configure_threads(args.threads)
+
+    while True:
+        wait = seconds_until_window(args.window)
+        if wait > 0:
+            if args.once:
+                logger.info("Outside the off-peak window, nothing to do")
+                return
+            logger.info("Waiting %.0f s for the off-peak window", wait)
+            time.sleep(wait)
+        run_pass(sources, model_choices, budget, args.window, args.max_videos)
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
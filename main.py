@@ -1,61 +1,224 @@
-from transcription import fetch_transcript,speech_to_text
-from summarize import get_summary,clean_summary
-from features import get_vid_data,fetch_translated_text,ttspeech
+import logging
+import os
+import threading
+from archive import ARCHIVE_DIR,Archive
+from cache import ResultCache,content_key
+from coalesce import SingleFlight
+from errors import PipelineError,TranscriptionError,SummarizationError,TranslationError,SpeechSynthesisError,VideoDataError
+from transcription import fetch_transcript,speech_to_text_with_language,get_video_id,get_transcript_segments,get_transcript_language,has_manual_subtitles
+from transcript_index import TranscriptIndex
+from summarize import get_summary_with_report,clean_summary,is_english
+from model_backends import MULTILINGUAL_SUMMARY_MODEL
+from features import get_vid_data,fetch_translated_text,ttspeech,iter_speech
+from workers import run_inference
+from metrics import cache_event
+from profiling import profile_job
+
+logger=logging.getLogger(__name__)
+
+# Concurrent sessions asking for the same video or summary share one computation
+_transcripts=SingleFlight("transcript_inflight")
+_summaries=SingleFlight("summary_inflight")
+
+# Transcripts and summaries persisted across restarts, shared with the ingest worker (ingest.py)
+RESULT_CACHE_DIR=os.environ.get("RESULT_CACHE_DIR",os.path.join(os.path.dirname(os.path.abspath(__file__)),".result_cache"))
+# Size limit of the result cache; 0 disables it, e.g. in load tests
+RESULT_CACHE_BYTES=int(os.environ.get("RESULT_CACHE_BYTES",str(1024**3)))
+_results=ResultCache(RESULT_CACHE_DIR,RESULT_CACHE_BYTES)
+
+def _store_result(key,value):
+    # Caching is best-effort: a full or read-only disk must not fail a computed result
+    try:
+        _results.put(key,value)
+    except Exception:
+        logger.exception("Storing result in the result cache failed")
+
+# Processed videos are kept in the compressed archive (see archive.py); ARCHIVE_DIR="" turns it off
+_archive=None
+_archive_lock=threading.Lock()
+
+def _get_archive():
+    global _archive
+    if not ARCHIVE_DIR:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive=Archive(ARCHIVE_DIR)
+        return _archive
+
+def _archived(video_id):
+    # Like the result cache, the archive is best-effort
+    try:
+        archive=_get_archive()
+        return archive.get(video_id) if archive is not None else None
+    except Exception:
+        logger.exception("Reading from the archive failed")
+        return None
+
+def _archive_video(video_id,**fields):
+    try:
+        archive=_get_archive()
+        if archive is not None:
+            archive.put(video_id,**fields)
+    except Exception:
+        logger.exception("Writing to the archive failed")
 
 global transcript
 transcript=""
 
-def get_transcript(video_link):
+def _fetch_transcript(video_link):
+    # The cleaned transcript, its language and whether it came from manual
+    # subtitles (which selects the summarization path), as stored in the result cache
+    with profile_job("get_transcript"):
+        text=fetch_transcript(video_link).capitalize()
+        language=get_transcript_language(video_link)
+        manual_subtitles=has_manual_subtitles(video_link)
+        text=clean_summary(text,language)
+    try:
+        segments=get_transcript_segments(video_link)
+    except Exception:
+        segments=None
+    _archive_video(get_video_id(video_link),transcript=text,language=language,segments=segments,
+                   manual_subtitles=manual_subtitles)
+    return {"text":text,"language":language,"manual_subtitles":manual_subtitles}
+
+def get_transcript(video_link,on_language=None):
+    # Returns the transcript and whether it came from manual subtitles, which
+    # callers pass on to summarize_transcript
     global transcript
     transcript=""
     try:
-        transcript= fetch_transcript(video_link).capitalize()
-        transcript=clean_summary(transcript)        
-        return transcript
+        video_id=get_video_id(video_link)
+        key=("transcript",video_id)
+        result=_results.get(key)
+        if result is None:
+            record=_archived(video_id)
+            if record is not None and record["transcript"]:
+                result={"text":record["transcript"],"language":record["language"],"manual_subtitles":bool(record.get("manual_subtitles"))}
+        cache_event("result_transcript",result is not None)
+        if result is None:
+            result=_transcripts.do(key,_fetch_transcript,video_link)
+            _store_result(key,result)
+        transcript=result["text"]
+        if on_language is not None:
+            on_language(result["language"])
+        return transcript,result["manual_subtitles"]
+    except PipelineError:
+        raise
     except Exception as e:
-        return f"An error during transcription."
+        logger.exception("Transcription failed")
+        raise TranscriptionError("An error during transcription.") from e
+
+def get_transcript_index(video_link):
+    try:
+        record=_archived(get_video_id(video_link))
+        segments=record["segments"] if record is not None and record["segments"] else get_transcript_segments(video_link)
+    except PipelineError:
+        raise
+    except Exception as e:
+        logger.exception("Transcript indexing failed")
+        raise TranscriptionError("An error during transcription.") from e
+    if not segments:
+        raise TranscriptionError("No timed transcript is available for this video.")
+    return TranscriptIndex(segments)
 
 def translate_summary(text,lang_choice):
     try :
         return fetch_translated_text(text,lang_choice).capitalize()
         
     except Exception as e:
-       return f"An error during translation."
+       logger.exception("Translation failed")
+       raise TranslationError("An error during translation.") from e
     
 def get_data(link):
     try :
+        video_id=get_video_id(link)
+        record=_archived(video_id)
+        if record is not None and record["metadata"]:
+            return record["metadata"]
         data=get_vid_data(link)
         title=data['Title']
         duration=data['Duration']
         description=data['Description']
     except Exception as e:
-        return f"An error occured during fetching video data."
+        logger.exception("Fetching video data failed")
+        raise VideoDataError("An error occured during fetching video data.") from e
+    _archive_video(video_id,metadata=data)
+    return data
     
-def audio_to_text(link="",audio_file=True):
+def audio_to_text(link="",audio_file=True,on_language=None):
     try :
-        transcript=clean_summary(speech_to_text("",True))
+        transcript,language=speech_to_text_with_language("",True)
+        transcript=clean_summary(transcript,language)
+        if on_language is not None:
+            on_language(language)
         return transcript
+    except PipelineError:
+        raise
     except Exception as e:
-        return f"An error transcribing audio file."
+        logger.exception("Audio transcription failed")
+        raise TranscriptionError("An error transcribing audio file.") from e
     
-def text_to_speech(text,language):
+def text_to_speech(text,language,on_first_chunk=None):
+    # on_first_chunk gets the first synthesized chunk once, so playback can
+    # start while the rest is generated
     try :
-        tts=ttspeech(text,language)
+        if on_first_chunk is None:
+            return ttspeech(text,language)
+        chunks=[]
+        for frames in iter_speech(text,language):
+            if not chunks:
+                on_first_chunk(frames)
+            chunks.append(frames)
+        return b"".join(chunks)
     except Exception as e:
-        return f"An error occured during generating audible summary."
+        logger.exception("Audible summary generation failed")
+        raise SpeechSynthesisError("An error occured during generating audible summary.") from e
+
+def _summarize(manual_subtitles,text,model_choice,sla_seconds,on_report,language):
+    # Runs in an inference worker when INFERENCE_WORKERS is set, so the
+    # generation plans come back with the summary instead of through on_report
+    summary,plans=run_inference(get_summary_with_report,manual_subtitles,text,model_choice,sla_seconds,language)
+    if on_report is not None:
+        for plan in plans:
+            on_report(plan)
+    if not is_english(language) and not MULTILINGUAL_SUMMARY_MODEL:
+        # Without a multilingual model the summary is extracted in the source
+        # language, and only it is translated to English
+        summary=clean_summary(fetch_translated_text(summary,"English"))
+    return summary
 
-def summarize_transcript(text,model_choice):
+def summarize_transcript(text,model_choice,sla_seconds=None,on_report=None,language=None,video_link=None,manual_subtitles=False):
+    # manual_subtitles is the flag returned by get_transcript; transcripts of
+    # manual subtitles are shortened extractively first.
+    # Non-English transcripts are summarized in their own language, so only
+    # the much shorter summary needs translating (see translate_summary).
+    # Summaries of a video_link within the default latency budget are also archived.
     if len(text)<=150:
-        return clean_summary(text) 
+        return clean_summary(text,language) 
 
-    from transcription import manual_subtitles
     try :
-        summary=get_summary(manual_subtitles,text,model_choice)
+        key=("summary",content_key(text),manual_subtitles,model_choice,sla_seconds,language)
+        summary=_results.get(key)
+        video_id=get_video_id(video_link) if video_link and sla_seconds is None else None
+        if summary is None and video_id is not None:
+            record=_archived(video_id)
+            if record is not None and record["transcript"]==text:
+                summary=record["summaries"].get(str(model_choice))
+        cache_event("result_summary",summary is not None)
+        if summary is None:
+            summary=_summaries.do(key,_summarize,manual_subtitles,text,model_choice,sla_seconds,on_report,language)
+            _store_result(key,summary)
+            if video_id is not None:
+                _archive_video(video_id,summaries={model_choice:summary})
+    except PipelineError:
+        raise
     except Exception as e:
-        return f"An error occured during summarization."
+        logger.exception("Summarization failed")
+        raise SummarizationError("An error occured during summarization.") from e
     return summary    
  
    
-# print(summarize_transcript(get_transcript("https://www.youtube.com/watch?v=MrF0mWZQO6o"),1))
-# print(summarize_transcript(get_transcript("https://www.youtube.com/watch?v=tR1ECf4sEpw"),2))
+# transcript,manual_subtitles=get_transcript("https://www.youtube.com/watch?v=MrF0mWZQO6o")
+# print(summarize_transcript(transcript,1,manual_subtitles=manual_subtitles))
 
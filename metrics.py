@@ -0,0 +1,320 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Number of finished spans kept for the JSON trace export
+TRACE_LENGTH = 1000
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A single timed execution of a pipeline stage.
+
+    Args:
+        stage (str): The name of the stage.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self.sizes = {}
+
+    def set(self, **sizes):
+        """
+        Record input sizes of the stage, e.g. chars=1200 or audio_seconds=35.2.
+        """
+        self.sizes.update(sizes)
+
+    @classmethod
+    def from_dict(cls, data):
+        span = cls(data["stage"])
+        span.start = data["start"]
+        span.duration = data["duration"]
+        span.error = data["error"]
+        span.sizes = dict(data["sizes"])
+        return span
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "sizes": self.sizes,
+        }
+
+
+class Metrics:
+    """
+    Thread-safe registry of per-stage latencies, input sizes, errors and cache hits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collected = None
+        self.reset()
+
+    def reset(self):
+        """
+        Discard everything recorded so far.
+        """
+        with self._lock:
+            self._stages = {}
+            self._caches = {}
+            self._trace = deque(maxlen=TRACE_LENGTH)
+
+    def _record(self, span):
+        with self._lock:
+            stats = self._stages.setdefault(span.stage, {
+                "count": 0,
+                "errors": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "sizes": {},
+            })
+            stats["count"] += 1
+            stats["seconds"] += span.duration
+            stats["max_seconds"] = max(stats["max_seconds"], span.duration)
+            if span.error:
+                stats["errors"] += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if span.duration <= bound:
+                    stats["buckets"][i] += 1
+            for measure, value in span.sizes.items():
+                size = stats["sizes"].setdefault(measure, {"sum": 0, "count": 0})
+                size["sum"] += value
+                size["count"] += 1
+            self._trace.append(span.to_dict())
+            if self._collected is not None:
+                self._collected.append(span.to_dict())
+
+    def collect(self):
+        """
+        Keep finished spans so that take_collected can hand them to another
+        process, e.g. from an inference worker back to the app.
+        """
+        with self._lock:
+            if self._collected is None:
+                self._collected = []
+
+    def take_collected(self):
+        """
+        Returns:
+            list: The spans finished since the last call, as dictionaries.
+        """
+        with self._lock:
+            if self._collected is None:
+                return []
+            spans, self._collected = self._collected, []
+            return spans
+
+    def merge(self, spans):
+        """
+        Record spans that were measured in another process.
+
+        Args:
+            spans (list): Span dictionaries returned by take_collected.
+        """
+        for data in spans:
+            self._record(Span.from_dict(data))
+
+    def cache_event(self, cache, hit):
+        """
+        Count a lookup in the named cache.
+
+        Args:
+            cache (str): The name of the cache.
+            hit (bool): Whether the lookup was a hit.
+        """
+        with self._lock:
+            counts = self._caches.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def export_json(self):
+        """
+        Returns:
+            dict: Per-stage statistics, cache counters and the most recent spans.
+        """
+        with self._lock:
+            stages = {}
+            for stage, stats in self._stages.items():
+                stages[stage] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "total_seconds": stats["seconds"],
+                    "mean_seconds": stats["seconds"] / stats["count"],
+                    "max_seconds": stats["max_seconds"],
+                    "sizes": {measure: dict(size) for measure, size in stats["sizes"].items()},
+                }
+            return {
+                "stages": stages,
+                "caches": {cache: dict(counts) for cache, counts in self._caches.items()},
+                "trace": list(self._trace),
+            }
+
+    def export_prometheus(self):
+        """
+        Returns:
+            str: The recorded metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP pipeline_stage_seconds Latency of pipeline stages.",
+            "# TYPE pipeline_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, stats in sorted(self._stages.items()):
+                for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                    lines.append(f'pipeline_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'pipeline_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats["count"]}')
+                lines.append(f'pipeline_stage_seconds_sum{{stage="{stage}"}} {stats["seconds"]}')
+                lines.append(f'pipeline_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+            lines.append("# HELP pipeline_stage_errors_total Failed executions of pipeline stages.")
+            lines.append("# TYPE pipeline_stage_errors_total counter")
+            for stage, stats in sorted(self._stages.items()):
+                lines.append(f'pipeline_stage_errors_total{{stage="{stage}"}} {stats["errors"]}')
+
+            lines.append("# HELP pipeline_stage_input Input sizes of pipeline stages (chars, tokens, audio_seconds).")
+            lines.append("# TYPE pipeline_stage_input summary")
+            for stage, stats in sorted(self._stages.items()):
+                for measure, size in sorted(stats["sizes"].items()):
+                    lines.append(f'pipeline_stage_input_sum{{stage="{stage}",measure="{measure}"}} {size["sum"]}')
+                    lines.append(f'pipeline_stage_input_count{{stage="{stage}",measure="{measure}"}} {size["count"]}')
+
+            lines.append("# HELP pipeline_cache_requests_total Cache lookups by result.")
+            lines.append("# TYPE pipeline_cache_requests_total counter")
+            for cache, counts in sorted(self._caches.items()):
+                lines.append(f'pipeline_cache_requests_total{{cache="{cache}",result="hit"}} {counts["hits"]}')
+                lines.append(f'pipeline_cache_requests_total{{cache="{cache}",result="miss"}} {counts["misses"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """
+        Write the JSON export to a file.
+
+        Args:
+            path (str): The file to write.
+        """
+        with open(path, "w") as f:
+            json.dump(self.export_json(), f, indent=2)
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def stage(name, current=True):
+    """
+    Time a pipeline stage and record it in the metrics registry.
+
+    Args:
+        name (str): The name of the stage.
+        current (bool): Whether the span is the one record() adds to. Pass
+            False in generators, whose body shares the caller's context
+            between yields.
+
+    Yields:
+        Span: The span of the stage, for recording input sizes.
+    """
+    span = Span(name)
+    token = _current_span.set(span) if current else None
+    started = time.perf_counter()
+    try:
+        yield span
+    except GeneratorExit:
+        # A generator closed by its consumer, not a failure
+        raise
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - started
+        if token is not None:
+            _current_span.reset(token)
+        metrics._record(span)
+
+
+def traced(name):
+    """
+    Decorator that records every call of the function as the named stage.
+
+    Args:
+        name (str): The name of the stage.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(**sizes):
+    """
+    Record input sizes on the innermost active stage, if any.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.set(**sizes)
+
+
+def cache_event(cache, hit):
+    """
+    Count a lookup in the named cache.
+    """
+    metrics.cache_event(cache, hit)
+
+
+_server = None
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """
+    Serve /metrics (Prometheus) and /metrics.json from a background thread.
+    Calling it again once the server is running has no effect.
+
+    Args:
+        port (int): The port to listen on.
+        host (str): The address to bind to.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class PrometheusHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(metrics.export_json()).encode("utf-8")
+                content_type = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = metrics.export_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    global _server
+    with metrics._lock:
+        if _server is not None:
+            return
+        _server = ThreadingHTTPServer((host, port), PrometheusHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
@@ -0,0 +1,184 @@
+import os
+import shutil
+import tempfile
+import threading
+
+# Summarization models selectable in the app. SUMMARY_MODEL_1 and SUMMARY_MODEL_2
+# replace them, e.g. with small models in benchmarks; being read from the
+# environment, they also apply in inference worker processes
+SUMMARY_MODELS = {
+    1: os.environ.get("SUMMARY_MODEL_1", 't5-base'),
+    2: os.environ.get("SUMMARY_MODEL_2", 'sshleifer/distilbart-cnn-12-6'),
+}
+
+# Multilingual model that summarizes non-English transcripts in their own language,
+# e.g. MULTILINGUAL_SUMMARY_MODEL=csebuetnlp/mT5_multilingual_XLSum (about 2 GB).
+# Unset, non-English transcripts are summarized extractively and the summary is translated to English.
+MULTILINGUAL_SUMMARY_MODEL = os.environ.get("MULTILINGUAL_SUMMARY_MODEL", "")
+
+# Inference backends:
+#   torch - FP32 PyTorch, the reference implementation
+#   int8  - PyTorch with dynamic int8 quantization of the Linear layers
+#   onnx  - ONNX Runtime, exported once and cached in ONNX_CACHE_DIR
+BACKENDS = ('torch', 'int8', 'onnx')
+
+ONNX_CACHE_DIR = os.environ.get(
+    "ONNX_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache", "onnx"))
+
+
+def _parse_backends(value):
+    """
+    Parse a "model=backend,model=backend" setting into a dictionary.
+    """
+    backends = {}
+    for item in value.split(","):
+        if "=" in item:
+            model_name, backend = item.rsplit("=", 1)
+            backends[model_name.strip()] = backend.strip()
+    return backends
+
+
+# Backend used for models without an explicit choice, e.g. SUMMARY_BACKEND=int8
+DEFAULT_BACKEND = os.environ.get("SUMMARY_BACKEND", "torch")
+# Per-model choices, e.g. SUMMARY_BACKENDS="t5-base=onnx,sshleifer/distilbart-cnn-12-6=int8"
+MODEL_BACKENDS = _parse_backends(os.environ.get("SUMMARY_BACKENDS", ""))
+
+
+def set_backend(model_name, backend):
+    """
+    Select the inference backend for a model.
+
+    Args:
+        model_name (str): The Hugging Face name of the model.
+        backend (str): One of BACKENDS.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    MODEL_BACKENDS[model_name] = backend
+
+
+def backend_for(model_name):
+    """
+    Returns:
+        str: The inference backend selected for the model.
+    """
+    return MODEL_BACKENDS.get(model_name, DEFAULT_BACKEND)
+
+
+def onnx_model_dir(model_name):
+    """
+    Returns:
+        str: The directory holding the cached ONNX export of the model.
+    """
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+
+
+def _load_onnx(model_name):
+    """
+    Load the ONNX Runtime version of a model, exporting and caching it on first use.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    export_dir = onnx_model_dir(model_name)
+    if os.path.isdir(export_dir):
+        model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        return model, tokenizer
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # Save to a temporary directory and move it into place, so an interrupted
+    # export never leaves a partial directory that looks cached
+    os.makedirs(os.path.dirname(export_dir), exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(export_dir), prefix=os.path.basename(export_dir) + ".")
+    try:
+        model.save_pretrained(temp_dir)
+        tokenizer.save_pretrained(temp_dir)
+        os.replace(temp_dir, export_dir)
+    except OSError:
+        # Another process finished the same export first
+        if not os.path.isdir(export_dir):
+            raise
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return model, tokenizer
+
+
+class SharedPipeline:
+    """
+    A summarization pipeline shared by all threads of a process.
+
+    The model and its fast tokenizer are not safe to use from several threads
+    at once (the tokenizer fails with "Already borrowed"), so calls are serialized.
+
+    Args:
+        pipeline (transformers.Pipeline): The summarization pipeline.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            return self.pipeline(*args, **kwargs)
+
+    def count_tokens(self, text):
+        """
+        Returns:
+            int: The number of tokens the model's tokenizer splits text into.
+        """
+        with self.lock:
+            return len(self.pipeline.tokenizer.encode(text))
+
+
+def _load(model_name, backend):
+    from transformers import pipeline
+
+    if backend == 'torch':
+        return SharedPipeline(pipeline('summarization', model=model_name))
+    if backend == 'int8':
+        import torch
+
+        generator = pipeline('summarization', model=model_name)
+        generator.model = torch.quantization.quantize_dynamic(generator.model, {torch.nn.Linear}, dtype=torch.qint8)
+        return SharedPipeline(generator)
+    if backend == 'onnx':
+        model, tokenizer = _load_onnx(model_name)
+        return SharedPipeline(pipeline('summarization', model=model, tokenizer=tokenizer))
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+# Loaded pipelines by (model, backend), and the lock held while each one loads
+_loaded = {}
+_loading = {}
+_loading_lock = threading.Lock()
+
+
+def load_summarizer(model_name, backend=None):
+    """
+    Load a summarization pipeline for the model on the selected backend.
+
+    Loaded pipelines are kept in memory, so only the first call per model and
+    backend pays the loading (and, for ONNX, the export) cost.
+
+    Args:
+        model_name (str): The Hugging Face name of the model.
+        backend (str): One of BACKENDS. Defaults to backend_for(model_name).
+
+    Returns:
+        SharedPipeline: The summarization pipeline, safe to call from several threads.
+    """
+    key = (model_name, backend or backend_for(model_name))
+    generator = _loaded.get(key)
+    if generator is not None:
+        return generator
+    # Only callers of the same model and backend wait for a load in progress,
+    # which can take minutes (hub download, ONNX export)
+    with _loading_lock:
+        lock = _loading.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _loaded:
+            _loaded[key] = _load(*key)
+        return _loaded[key]
@@ -0,0 +1,162 @@
+"""
+Opt-in profiling of inference jobs.
+
+When enabled, every job run through workers.run_inference writes, under PROFILE_DIR:
+
+- <job>.prof: cProfile statistics (pstats, snakeviz)
+- <job>.collapsed: sampled stacks in the collapsed format read by
+  flamegraph.pl, speedscope and inferno (the format of py-spy --format raw)
+- <job>.<name>-<n>.torch.json and <job>.<name>-<n>.torch.stacks: torch
+  profiler traces of the n-th summarization generator or Whisper call of the
+  job (chrome://tracing, and collapsed stacks for flamegraph.pl)
+
+<job> is the start time, process and thread IDs, a sequence number and the
+job name, so concurrent jobs never share output files.
+
+Profiling is switched on by PROFILE=1 or at runtime by set_enabled, which
+creates a flag file that every process, including inference workers, checks
+at the start of each job, so no restart is needed.
+"""
+import contextlib
+import cProfile
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profiles"))
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+_FLAG_FILE = os.path.join(PROFILE_DIR, "enabled")
+
+_job = threading.local()
+_job_numbers = itertools.count(1)
+
+
+def enabled():
+    """
+    Returns:
+        bool: Whether profiling is switched on.
+    """
+    return os.environ.get("PROFILE") == "1" or os.path.exists(_FLAG_FILE)
+
+
+def set_enabled(on):
+    """
+    Switch profiling on or off for all processes sharing PROFILE_DIR.
+
+    Args:
+        on (bool): Whether to profile the following jobs.
+    """
+    if on:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        open(_FLAG_FILE, "w").close()
+    elif os.path.exists(_FLAG_FILE):
+        os.remove(_FLAG_FILE)
+
+
+class StackSampler:
+    """
+    Sample the stack of one thread at a fixed interval and count the
+    collapsed stacks, like py-spy does from outside the process.
+
+    Args:
+        thread_id (int): The thread to sample, see threading.get_ident.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="stack-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        """
+        Write the samples as collapsed stacks, one "frame;frame;frame count" line each.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def profile_job(name):
+    """
+    Profile the enclosed job with cProfile and the stack sampler, if profiling is enabled.
+
+    Args:
+        name (str): The job name, used in the output file names.
+    """
+    if not enabled() or getattr(_job, "prefix", None):
+        # Nested jobs are part of the enclosing job's profile
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    job = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}-{next(_job_numbers)}-{name}"
+    _job.prefix = os.path.join(PROFILE_DIR, job)
+    _job.torch_calls = Counter()
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        profiler.dump_stats(_job.prefix + ".prof")
+        sampler.write(_job.prefix + ".collapsed")
+        _job.prefix = None
+
+
+@contextlib.contextmanager
+def torch_profile(name):
+    """
+    Record the enclosed model calls with the torch profiler when a profiled job is running.
+
+    Args:
+        name (str): Identifies the calls in the output file names, e.g. "generate".
+    """
+    prefix = getattr(_job, "prefix", None)
+    if prefix is None:
+        yield
+        return
+    # A job may make several calls with the same name, e.g. two summarizers
+    _job.torch_calls[name] += 1
+    prefix = f"{prefix}.{name}-{_job.torch_calls[name]}"
+    try:
+        from torch.profiler import ProfilerActivity, profile
+    except ImportError:
+        # Engines without torch (e.g. faster-whisper, ONNX Runtime) are covered by cProfile
+        yield
+        return
+
+    with profile(activities=[ProfilerActivity.CPU], with_stack=True) as profiler:
+        yield
+    profiler.export_chrome_trace(f"{prefix}.torch.json")
+    profiler.export_stacks(f"{prefix}.torch.stacks", "self_cpu_time_total")
@@ -0,0 +1,182 @@
+import os
+import threading
+from dataclasses import dataclass, field
+
+from model_backends import SUMMARY_MODELS
+
+# model_choice value that lets the routing policy pick the model
+AUTO = "Auto"
+
+# Latency budget of a whole abstractive summary, in seconds
+SUMMARY_SLA_SECONDS = float(os.environ.get("SUMMARY_SLA_SECONDS", "60"))
+
+# Characters of input text per generation call
+CHUNK_SIZE = 1200
+# Rough characters per token of English text, used before the tokenizer is loaded
+CHARS_PER_TOKEN = 4
+
+# Initial CPU cost estimates per model: seconds per input token (encoder)
+# and per generated token of a single beam (decoder). They are refined from
+# observed latencies by record_latency.
+MODEL_COSTS = {
+    't5-base': {"input": 0.0006, "output": 0.030},
+    'sshleifer/distilbart-cnn-12-6': {"input": 0.0008, "output": 0.024},
+    'csebuetnlp/mT5_multilingual_XLSum': {"input": 0.0008, "output": 0.036},
+}
+# Estimates for models not listed above, e.g. small local models in benchmarks
+DEFAULT_COSTS = {"input": 0.0008, "output": 0.030}
+
+# Candidate (model, beams) pairs from highest to lowest expected quality
+_LADDER = (
+    ('sshleifer/distilbart-cnn-12-6', 4),
+    ('t5-base', 4),
+    ('sshleifer/distilbart-cnn-12-6', 2),
+    ('t5-base', 2),
+    ('sshleifer/distilbart-cnn-12-6', 1),
+    ('t5-base', 1),
+)
+# Extra cost of each additional beam relative to greedy decoding
+_BEAM_OVERHEAD = 0.35
+# Never shrink per-chunk summaries below this many tokens to meet the SLA
+_MIN_OUTPUT_TOKENS = 24
+# Weight of the newest observation in the calibration moving average
+_CALIBRATION_WEIGHT = 0.3
+
+_calibration = {}
+_calibration_lock = threading.Lock()
+
+
+@dataclass
+class GenerationPlan:
+    """
+    Model and generation parameters chosen for one abstractive summary.
+    """
+    model_name: str
+    chunks: list
+    min_new_tokens: int
+    max_new_tokens: int
+    num_beams: int
+    length_penalty: float
+    sla_seconds: float
+    expected_seconds: float
+    actual_seconds: float = None
+    notes: list = field(default_factory=list)
+
+    def generate_kwargs(self):
+        """
+        Returns:
+            dict: Keyword arguments for the summarization pipeline. For
+            encoder-decoder models min_length and max_length count generated tokens.
+        """
+        return {
+            "min_length": self.min_new_tokens,
+            "max_length": self.max_new_tokens,
+            "num_beams": self.num_beams,
+            "length_penalty": self.length_penalty,
+            "early_stopping": self.num_beams > 1,
+            "do_sample": False,
+        }
+
+
+def _output_tokens(text_length):
+    """
+    Per-chunk summary length bounds: longer inputs get shorter chunk summaries
+    so that the combined summary stays readable.
+    """
+    if text_length < 2000:
+        min_tokens = 60
+    elif text_length > 20000:
+        min_tokens = 40
+    else:
+        min_tokens = 50
+    return min_tokens, min_tokens + 60
+
+
+def estimate_seconds(model_name, chunks, max_new_tokens, num_beams):
+    """
+    Estimate the latency of summarizing the chunks.
+
+    Args:
+        model_name (str): The Hugging Face name of the model.
+        chunks (list): The input chunks.
+        max_new_tokens (int): The maximum summary length per chunk.
+        num_beams (int): The beam width.
+
+    Returns:
+        float: The expected latency in seconds.
+    """
+    costs = MODEL_COSTS.get(model_name, DEFAULT_COSTS)
+    input_tokens = sum(len(chunk) for chunk in chunks) / CHARS_PER_TOKEN
+    decode = len(chunks) * max_new_tokens * costs["output"] * (1 + _BEAM_OVERHEAD * (num_beams - 1))
+    with _calibration_lock:
+        factor = _calibration.get(model_name, 1.0)
+    return factor * (input_tokens * costs["input"] + decode)
+
+
+def plan_generation(text, sla_seconds=None, model_name=None):
+    """
+    Choose the model and generation parameters for summarizing text within a latency SLA.
+
+    The highest-quality configuration whose expected latency fits the SLA is
+    chosen. If none fits, the fastest one is used with shorter per-chunk
+    summaries.
+
+    Args:
+        text (str): The text to summarize.
+        sla_seconds (float): The latency budget. Defaults to SUMMARY_SLA_SECONDS.
+        model_name (str): Restrict the choice to this model. Defaults to any model.
+
+    Returns:
+        GenerationPlan: The chosen plan.
+    """
+    sla_seconds = sla_seconds or SUMMARY_SLA_SECONDS
+    chunks = [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+    min_tokens, max_tokens = _output_tokens(len(text))
+    candidates = [(name, beams) for name, beams in _LADDER if model_name in (None, name)]
+    if not candidates:
+        candidates = [(model_name, beams) for beams in (4, 2, 1)]
+
+    for name, beams in candidates:
+        expected = estimate_seconds(name, chunks, max_tokens, beams)
+        if expected <= sla_seconds:
+            return GenerationPlan(name, chunks, min_tokens, max_tokens, beams, 2.0 if beams > 1 else 1.0,
+                                  sla_seconds, expected)
+
+    # Nothing fits: take the fastest configuration and shorten the chunk summaries
+    name, beams = min(candidates, key=lambda candidate: estimate_seconds(candidate[0], chunks, max_tokens, candidate[1]))
+    full = estimate_seconds(name, chunks, max_tokens, beams)
+    encode = estimate_seconds(name, chunks, 0, beams)
+    decode_budget = max(sla_seconds - encode, 0)
+    max_tokens = max(_MIN_OUTPUT_TOKENS, int(max_tokens * decode_budget / (full - encode)))
+    min_tokens = min(min_tokens, max_tokens // 2)
+    plan = GenerationPlan(name, chunks, min_tokens, max_tokens, beams, 1.0, sla_seconds,
+                          estimate_seconds(name, chunks, max_tokens, beams))
+    if plan.expected_seconds > sla_seconds:
+        plan.notes.append("expected latency exceeds the SLA even with the shortest summaries")
+    return plan
+
+
+def record_latency(plan, actual_seconds):
+    """
+    Store the measured latency of a plan and recalibrate the model's cost estimate.
+
+    Args:
+        plan (GenerationPlan): The executed plan.
+        actual_seconds (float): The measured latency of the generation.
+    """
+    plan.actual_seconds = actual_seconds
+    if plan.expected_seconds <= 0:
+        return
+    with _calibration_lock:
+        factor = _calibration.get(plan.model_name, 1.0)
+        observed = factor * actual_seconds / plan.expected_seconds
+        _calibration[plan.model_name] = (1 - _CALIBRATION_WEIGHT) * factor + _CALIBRATION_WEIGHT * observed
+
+
+def model_name_for(model_choice):
+    """
+    Map an app model choice (1, 2 or AUTO) to a model name, None meaning any model.
+    """
+    if model_choice == AUTO:
+        return None
+    return SUMMARY_MODELS[model_choice]
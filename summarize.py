@@ -1,98 +1,189 @@
-import nltk 
-nltk.download('punkt')
-from transformers import pipeline
-from nltk.tokenize import sent_tokenize
-from sumy.summarizers.text_rank import TextRankSummarizer
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
+import time
 import unicodedata
 import warnings 
 import logging
+from metrics import record, stage, traced
+from profiling import torch_profile
+from model_backends import MULTILINGUAL_SUMMARY_MODEL, SUMMARY_MODELS, load_summarizer
+from routing import AUTO, model_name_for, plan_generation, record_latency
 
 warnings.filterwarnings("ignore")
 logging.getLogger("transformers").setLevel(logging.ERROR)
 
-def get_summary(manual_subtitles, text, model_choice):
+# nltk, transformers and sumy are imported inside the functions that need them
+# so that importing this module stays cheap.
+_nltk_resources_checked = False
+
+# Share of the sentences kept by the extractive summary of non-English text
+# when no multilingual model is configured; only this summary is translated
+SOURCE_LANGUAGE_SUMMARY_RATIO = 0.2
+
+# NLTK punkt tokenizers by language code
+_PUNKT_LANGUAGES = {
+    "cs": "czech", "da": "danish", "de": "german", "el": "greek", "es": "spanish", "et": "estonian",
+    "fi": "finnish", "fr": "french", "it": "italian", "nl": "dutch", "no": "norwegian", "nb": "norwegian",
+    "pl": "polish", "pt": "portuguese", "ru": "russian", "sl": "slovene", "sv": "swedish", "tr": "turkish",
+}
+
+def ensure_nltk_resources():
+    """
+    Check once per process that the NLTK punkt tokenizer is installed.
+
+    The data is looked up locally and only downloaded when it is missing,
+    instead of contacting the NLTK server on every start.
+    """
+    global _nltk_resources_checked
+    if _nltk_resources_checked:
+        return
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+    _nltk_resources_checked = True
+
+def sent_tokenize(text, language="english"):
+    """
+    Split text into sentences with NLTK's punkt tokenizer.
+    """
+    ensure_nltk_resources()
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    return nltk_sent_tokenize(text, language)
+
+def tokenizer_language(language):
+    """
+    Returns:
+        str: The punkt tokenizer name for a language code, "english" for English and unsupported languages.
+    """
+    if is_english(language):
+        return "english"
+    return _PUNKT_LANGUAGES.get(language.lower().split("-")[0], "english")
+
+def is_english(language):
+    """
+    Returns:
+        bool: Whether a language code (e.g. "en", "en-US") is English. An unknown language (None) counts as English.
+    """
+    return language is None or language.lower().split("-")[0] == "en"
+
+def get_summary(manual_subtitles, text, model_choice, sla_seconds=None, on_report=None, language=None):
     """
     Get the summary of the given text using extractive and/or abstractive summarization.
 
+    Non-English text is summarized in its own language: by MULTILINGUAL_SUMMARY_MODEL
+    if one is configured, otherwise extractively with TextRank, and the caller
+    translates the summary (see main._summarize).
+
     Returns:
-        str or list: The generated summary. If model_choice is not 1 or 2, a list containing both T5 and DistilBART summaries.
+        str or list: The generated summary. If model_choice is not 1, 2 or AUTO, a list containing both T5 and DistilBART summaries.
     """
+    if not is_english(language):
+        if not MULTILINGUAL_SUMMARY_MODEL:
+            return get_extractive_summary(text, language, SOURCE_LANGUAGE_SUMMARY_RATIO)
+        return get_abstractive_summary(text, model_choice, sla_seconds, on_report, language)
     if manual_subtitles:
         extractive_summary = get_extractive_summary(text)
-        abstractive_summary = get_abstractive_summary(extractive_summary, model_choice)
+        abstractive_summary = get_abstractive_summary(extractive_summary, model_choice, sla_seconds, on_report)
     else:
-        abstractive_summary = get_abstractive_summary(text, model_choice)
+        abstractive_summary = get_abstractive_summary(text, model_choice, sla_seconds, on_report)
     
     return abstractive_summary
 
 
-def get_abstractive_summary(text, model_choice):
+def get_summary_with_report(manual_subtitles, text, model_choice, sla_seconds=None, language=None):
+    """
+    Get the summary like get_summary, together with the generation plans that produced it.
+    Used when summarizing in a worker process, where a callback can't reach the caller.
+
+    Returns:
+        tuple: The summary and the list of executed GenerationPlans.
+    """
+    plans = []
+    summary = get_summary(manual_subtitles, text, model_choice, sla_seconds, plans.append, language)
+    return summary, plans
+
+
+@traced("get_abstractive_summary")
+def get_abstractive_summary(text, model_choice, sla_seconds=None, on_report=None, language=None):
     """
     Generate an abstractive summary of the given text using a transformer-based model.
     
     Args:
         text (str): The input text to summarize.
-        model_choice (int): The choice of model:
+        model_choice (int or str): The choice of model:
             - 1: T5-base model
             - 2: DistilBART-CNN-12-6 model
+            - AUTO: chosen by the routing policy from the input size and SLA
+            The inference backend of each model is chosen in model_backends.
+        sla_seconds (float): The latency budget. Defaults to routing.SUMMARY_SLA_SECONDS.
+        on_report (callable): Called with the executed GenerationPlan, which
+            holds the expected and actual latency.
+        language (str): The language code of the text. Non-English text is
+            summarized by MULTILINGUAL_SUMMARY_MODEL regardless of model_choice.
     
     Returns:
-        str or list: The generated summary. If model_choice is not 1 or 2, a list containing both T5 and DistilBART summaries.
+        str or list: The generated summary. If model_choice is not 1, 2 or AUTO, a list containing both T5 and DistilBART summaries.
     """
-    # Select the appropriate model pipeline based on the model_choice
-    if model_choice == 1:
-        generator = pipeline('summarization', model='t5-base')
-    elif model_choice == 2:
-        generator = pipeline('summarization', model='sshleifer/distilbart-cnn-12-6')
-    else:
+    if not is_english(language):
+        model_name = MULTILINGUAL_SUMMARY_MODEL
+    elif model_choice not in SUMMARY_MODELS and model_choice != AUTO:
         # If model_choice is not 1 or 2, recursively call the function for both models and return a list of summaries
-        t5_summary = get_abstractive_summary(text, model_choice=1)
+        t5_summary = get_abstractive_summary(text, 1, sla_seconds, on_report)
          
-        distilbart_summary = get_abstractive_summary(text, model_choice=2)
+        distilbart_summary = get_abstractive_summary(text, 2, sla_seconds, on_report)
         return [t5_summary, distilbart_summary]
-        
+    else:
+        model_name = model_name_for(model_choice)
+
+    # Pick the model, summary lengths and beam width that fit the latency budget
+    plan = plan_generation(text, sla_seconds, model_name)
+
+    # Load the model pipeline on the inference backend configured for it
+    with stage("get_abstractive_summary.model_load"):
+        generator = load_summarizer(plan.model_name)
+
+    record(chars=len(text), tokens=generator.count_tokens(text))
 
+    # Generate the summary chunk by chunk
     full_summary = ""
-    start, chunk_size = 0, 1200
-    end = min(chunk_size, len(text))
-    
-    # Determine the length parameter based on the length of the text
-    if len(text) < 2000:
-        length = 80
-    elif len(text) > 20000:
-        length = 60
-    else:
-        length = 70
-    
-    # Generate the summary in chunks until the full text is processed
-    while start < len(text):
-        chunk = text[start:end]
-        summary = generator(chunk, min_length=length, do_sample=False)
-        full_summary += summary[0]["summary_text"]
-        start = end
-        end = min(start + chunk_size, len(text))
-       
-    full_summary=clean_summary(full_summary)
-    del generator
+    started = time.perf_counter()
+    with stage("get_abstractive_summary.inference"), torch_profile("generate"):
+        for chunk in plan.chunks:
+            summary = generator(chunk, **plan.generate_kwargs())
+            full_summary += summary[0]["summary_text"]
+    record_latency(plan, time.perf_counter() - started)
+    record(expected_seconds=plan.expected_seconds, actual_seconds=plan.actual_seconds)
+    if on_report is not None:
+        on_report(plan)
+
+    full_summary=clean_summary(full_summary, language)
 
     return full_summary
 
 
-def get_extractive_summary(text):
+@traced("get_extractive_summary")
+def get_extractive_summary(text, language=None, ratio=0.70):
     """
     Generate an extractive summary of the given text using TextRank algorithm.
     
     Args:
         text (str): The input text to summarize.
+        language (str): The language code of the text, None for English.
+        ratio (float): The share of the sentences to keep.
     
     Returns:
         int: The length of the extractive summary.
     """
     
-    parser = PlaintextParser.from_string(text, Tokenizer("english"))
-    req_sentences = round(len(sent_tokenize(text)) * 0.70)
+    from sumy.summarizers.text_rank import TextRankSummarizer
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.nlp.tokenizers import Tokenizer
+
+    ensure_nltk_resources()
+    record(chars=len(text))
+    tokenizer = tokenizer_language(language)
+    parser = PlaintextParser.from_string(text, Tokenizer(tokenizer))
+    req_sentences = max(1, round(len(sent_tokenize(text, tokenizer)) * ratio))
     summarizer = TextRankSummarizer()
     summary = summarizer(parser.document, req_sentences)
     ext_summary = ""
@@ -102,11 +193,15 @@ def get_extractive_summary(text):
 
     return ext_summary
 
-def clean_summary(text):
-    error_dict=["An error during transcription.","An error during translation.","An error occured during fetching video data.","An error transcribing audio file.","An error occured during generating audible summary.","An error occured during summarization.","Video not found, enter a valid youtube video link.","An error occured during transcription.",'An Error occurred with given link.',"Only english language is supported for transcription."]
-    for i in error_dict:
-        if i==text:
-            return text
+def clean_summary(text, language=None):
+    """
+    Remove caption markup and normalize sentence case. English text is also
+    folded to ASCII; other languages keep their letters.
+
+    Args:
+        text (str): The transcript or summary.
+        language (str): The language code of the text, None for English.
+    """
     irrelevant_terms = ["[music]", "[Music]", "\n","<<",">>"]
     sentence_list = sent_tokenize(text)
     
@@ -121,8 +216,11 @@ def clean_summary(text):
         item=item.strip()
         s=s+" "+item.capitalize()
    
-    normalized_text = unicodedata.normalize('NFKD', s)
-    formatted_text = normalized_text.encode('ascii', 'ignore').decode('ascii')
+    if not is_english(language):
+        formatted_text = unicodedata.normalize('NFC', s)
+    else:
+        normalized_text = unicodedata.normalize('NFKD', s)
+        formatted_text = normalized_text.encode('ascii', 'ignore').decode('ascii')
     cleaned_text = formatted_text.replace("\'", "'")
     return cleaned_text
 
@@ -0,0 +1,127 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our she so that the "
+    "their them they this to was we were what when which who will with you your".split()
+)
+
+
+def tokenize(text):
+    """
+    Split text into lowercase words, dropping common stopwords.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list: The words.
+    """
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class TranscriptIndex:
+    """
+    Inverted index from words to the timed transcript segments that contain them.
+
+    Args:
+        segments (list): Transcript segments as {"start", "end", "text"} dictionaries.
+    """
+
+    def __init__(self, segments):
+        self.segments = segments
+        self._postings = defaultdict(list)
+        for position, segment in enumerate(segments):
+            for word in set(tokenize(segment["text"])):
+                self._postings[word].append(position)
+
+    def _idf(self, word):
+        return math.log(1 + len(self.segments) / (1 + len(self._postings.get(word, ()))))
+
+    def _range(self, first, last, score):
+        return {
+            "start": self.segments[first]["start"],
+            "end": self.segments[last]["end"],
+            "text": " ".join(segment["text"] for segment in self.segments[first:last + 1]),
+            "score": score,
+        }
+
+    def search(self, query, limit=10):
+        """
+        Find the time ranges where a keyword or phrase is spoken.
+
+        Segments containing every word of the query are returned; a phrase may
+        span two consecutive segments. Adjacent matches are merged into one range.
+
+        Args:
+            query (str): The keyword or phrase.
+            limit (int): The maximum number of ranges.
+
+        Returns:
+            list: Ranges as {"start", "end", "text", "score"} dictionaries, in time order.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        postings = [set(self._postings.get(word, ())) for word in words]
+        # A segment matches if it, or it together with the next one, holds every word
+        matches = set.intersection(*postings)
+        for position in set.union(*postings):
+            if all(position in posting or position + 1 in posting for posting in postings):
+                matches.add(position)
+
+        ranges = []
+        for position in sorted(matches):
+            last = position + 1 if any(position not in posting for posting in postings) else position
+            if ranges and position <= ranges[-1][1] + 1:
+                ranges[-1][1] = max(ranges[-1][1], last)
+            else:
+                ranges.append([position, last])
+        return [self._range(first, last, len(words)) for first, last in ranges[:limit]]
+
+    def locate(self, sentence, window=3, limit=3):
+        """
+        Find the time ranges that best match a sentence, e.g. one from the summary.
+
+        Segments are scored by the IDF-weighted overlap of their words with the
+        sentence, and the best runs of up to window consecutive segments are returned.
+
+        Args:
+            sentence (str): The sentence to locate.
+            window (int): The maximum number of consecutive segments in a range.
+            limit (int): The maximum number of ranges.
+
+        Returns:
+            list: Ranges as {"start", "end", "text", "score"} dictionaries, best first.
+        """
+        words = Counter(tokenize(sentence))
+        scores = Counter()
+        for word in words:
+            weight = self._idf(word)
+            for position in self._postings.get(word, ()):
+                scores[position] += weight
+        if not scores:
+            return []
+
+        candidates = []
+        for first in scores:
+            total, best = 0.0, None
+            for last in range(first, min(first + window, len(self.segments))):
+                total += scores.get(last, 0.0)
+                # Longer windows must earn their extra length
+                value = total / math.sqrt(last - first + 1)
+                if best is None or value > best[0]:
+                    best = (value, first, last)
+            candidates.append(best)
+
+        ranges, used = [], set()
+        for value, first, last in sorted(candidates, reverse=True):
+            if used.intersection(range(first, last + 1)):
+                continue
+            used.update(range(first, last + 1))
+            ranges.append(self._range(first, last, value))
+            if len(ranges) == limit:
+                break
+        return ranges
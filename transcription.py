@@ -1,22 +1,93 @@
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptAvailable, NoTranscriptFound, VideoUnavailable 
-from googletrans import LANGUAGES
-import whisper
-from pytube import YouTube
+import re
 import warnings
+from urllib.parse import parse_qs, urlparse
+from asr import get_asr_backend, transcribe_windows
+from cache import LRUCache
+from errors import InvalidLinkError, TranscriptionError, VideoNotFoundError
+from audio import fetch_audio, iter_audio_windows
+from metrics import record, stage, traced
+from profiling import torch_profile
+from workers import run_inference
 
 # Suppress FP16 warnings
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 
 manual_subtitles=False
 
+_VIDEO_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+# Where captions come from; None means YouTube via youtube_transcript_api
+_caption_source = None
+
+# Timed segments of recently transcribed videos, by video ID
+SEGMENT_CACHE_VIDEOS = 256
+_segments = LRUCache(SEGMENT_CACHE_VIDEOS, sizeof=lambda segments: 1)
+# Language codes of recently transcribed videos, by video ID
+_languages = LRUCache(SEGMENT_CACHE_VIDEOS, sizeof=lambda language: 1)
+# Whether the transcripts of recently transcribed videos came from manual subtitles, by video ID
+_manual_subtitles = LRUCache(SEGMENT_CACHE_VIDEOS, sizeof=lambda manual: 1)
+
+def set_caption_source(source):
+    """
+    Replace the source of YouTube captions used by fetch_transcript.
+
+    The source must provide ``list_transcripts(video_id)`` like
+    youtube_transcript_api.YouTubeTranscriptApi, e.g. a local stand-in in load tests.
+    None restores YouTube.
+
+    Args:
+        source: The caption source.
+
+    Returns:
+        The previously installed source.
+    """
+    global _caption_source
+    previous = _caption_source
+    _caption_source = source
+    return previous
+
 def eng_aliases():
     # Add aliases for English languages
+    from googletrans import LANGUAGES
 
     LANGUAGES['en-us']='English'
     LANGUAGES['en-US']='English'
     LANGUAGES['en-gb']='English'
     LANGUAGES['en-GB']='English'
+    return LANGUAGES
+
+def get_video_id(video_link):
+    """
+    Extracts the video ID from a YouTube link.
+
+    Supports watch?v= links with extra parameters, youtu.be short links,
+    /shorts/, /embed/ and /live/ links, and bare video IDs.
+
+    Args:
+        video_link (str): The YouTube video link or ID.
 
+    Returns:
+        str: The 11-character video ID.
+
+    Raises:
+        InvalidLinkError: If no video ID can be found in the link.
+    """
+    video_link = video_link.strip()
+    if _VIDEO_ID.match(video_link):
+        return video_link
+    url = urlparse(video_link if "//" in video_link else "https://" + video_link)
+    candidates = parse_qs(url.query).get("v", [])
+    path = [part for part in url.path.split("/") if part]
+    if url.netloc.endswith("youtu.be") and path:
+        candidates.append(path[0])
+    elif len(path) >= 2 and path[0] in ("shorts", "embed", "live", "v"):
+        candidates.append(path[1])
+    for candidate in candidates:
+        if _VIDEO_ID.match(candidate):
+            return candidate
+    raise InvalidLinkError("An Error occurred with given link.")
+
+@traced("fetch_transcript")
 def fetch_transcript(video_link):
     """Fetches the transcript for a given YouTube video link.
 
@@ -24,55 +95,65 @@ def fetch_transcript(video_link):
         video_link (str): A string containing the YouTube video link.
 
     Returns:
-        str: A string containing the video's transcript, or an error message if the transcript cannot be found or generated.
+        str: A string containing the video's transcript.
+
+    Raises:
+        VideoNotFoundError: If the video is unavailable.
+        TranscriptionError: If the transcript cannot be found or generated.
     """
 
+    from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptAvailable, NoTranscriptFound, VideoUnavailable
+
     # Extract the video ID from the video_link
-    video_id = video_link.split('=')[1]
+    video_id = get_video_id(video_link)
     transcript=""
-    eng_aliases()
+    global manual_subtitles
+    manual_subtitles=False
+    # English captions are preferred, otherwise captions in any language are
+    # kept in that language instead of being translated by YouTube
+    LANGUAGES = ['en', 'en-US', 'en-GB', *eng_aliases()]
     
     try:
-        # Try to find a manually created transcript in English or American English
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        manual_transcript = transcript_list.find_manually_created_transcript(LANGUAGES.keys())
-        if manual_transcript.language_code.lower() not in ['en','en-us','en-gb']:
-            transcript=manual_transcript.translate('en')
-        else:
-            transcript = manual_transcript   
-        global manual_subtitles     
+        # Try to find a manually created transcript, preferably in English
+        transcript_list = (_caption_source or YouTubeTranscriptApi).list_transcripts(video_id)
+        transcript = transcript_list.find_manually_created_transcript(LANGUAGES)
         manual_subtitles=True
 
     except NoTranscriptFound:
         try:
-            auto_gen_transcript= transcript_list.find_generated_transcript(LANGUAGES.keys())
-            if auto_gen_transcript.language_code.lower() not in ['en','en-us','en-gb']:
-                transcript=auto_gen_transcript.translate('en')
-            else:
-                transcript = auto_gen_transcript   
+            transcript = transcript_list.find_generated_transcript(LANGUAGES)
 
         except:
             return speech_to_text(video_link)
     
-    except VideoUnavailable:
-        return "Video not found, enter a valid youtube video link."
+    except VideoUnavailable as e:
+        raise VideoNotFoundError("Video not found, enter a valid youtube video link.") from e
     
     except (TranscriptsDisabled, NoTranscriptAvailable):
         return speech_to_text(video_link)
     
     except Exception as e:
-        return f"An error occured during transcription."
+        raise TranscriptionError("An error occured during transcription.") from e
     try:
-        transcript_text = " ".join([item['text'] for item in transcript.fetch()]).replace("\n"," ")
+        items = transcript.fetch()
+        transcript_text = " ".join([item['text'] for item in items]).replace("\n"," ")
+        _segments.put(video_id, [
+            {"start": item['start'], "end": item['start'] + item['duration'], "text": item['text'].replace("\n"," ")}
+            for item in items
+        ])
+        _languages.put(video_id, transcript.language_code)
+        _manual_subtitles.put(video_id, manual_subtitles)
+        record(chars=len(transcript_text))
         return transcript_text  
     
     except Exception as e:
-        return e
+        raise TranscriptionError("An error occured during transcription.") from e
       
 
 def speech_to_text(video_link, has_audio_file=False):
     """
-    Downloads the audio from a YouTube video and transcribes it using the whisper library.
+    Downloads the audio of a YouTube video (see audio.fetch_audio) and transcribes it with the configured ASR backend
+    (openai-whisper by default, see asr.py).
 
     Args:
         video_link (str): The link to the YouTube video from which to extract audio.
@@ -80,31 +161,110 @@ def speech_to_text(video_link, has_audio_file=False):
     Returns:
         str: The transcribed text from the audio.
 
+    Raises:
+        InvalidLinkError: If no video ID can be found in the link.
+    """
+    return speech_to_text_with_language(video_link, has_audio_file)[0]
+
+def speech_to_text_with_language(video_link, has_audio_file=False):
+    """
+    Transcribe like speech_to_text, also returning the language detected in the audio.
+
+    The transcription runs according to the worker topology (see workers.run_inference);
+    the segments and language come back with the text and are recorded here.
+
+    Returns:
+        tuple: The transcribed text and its language code.
+    """
+    video_id = None if has_audio_file else get_video_id(video_link)
+    result = run_inference(transcribe_audio, video_link, has_audio_file)
+    if video_id is not None:
+        _segments.put(video_id, result['segments'])
+        _languages.put(video_id, result['language'])
+        _manual_subtitles.put(video_id, False)
+    return result['text'], result['language']
+
+@traced("speech_to_text")
+def transcribe_audio(video_link, has_audio_file=False):
+    """
+    Download (or read the uploaded) audio and transcribe it. Runs in an
+    inference worker when INFERENCE_WORKERS is set, so it returns everything
+    instead of recording it in this process.
+
+    Returns:
+        dict: The transcript "text", its "language", the timed "segments" and the "duration" in seconds.
     """
+    video_id = None
     if not has_audio_file:
-        try:
-            yt = YouTube(video_link)
-        except Exception as e:
-            return f'An Error occurred with given link.'
-
-        yt.streams.filter(file_extension='mp3')
-        stream = yt.streams.get_by_itag(139)
-        stream.download('', "audio_file0.mp3")
-            
-    model=whisper.load_model("base")
-    audio = whisper.load_audio("audio_file0.mp3")
-    audio = whisper.pad_or_trim(audio)
-    mel = whisper.log_mel_spectrogram(audio).to(model.device)
-    _, probs = model.detect_language(mel)
-    langs = {max(probs, key=probs.get)}
-
-    # if 'en' not in langs:
-    #     return "Only english language is supported for transcription."
-
-    result = model.transcribe("audio_file0.mp3")
+        video_id = get_video_id(video_link)
+        # Downloads only the audio, once per video, and caches it decoded
+        audio_path = fetch_audio(video_link, video_id)
+    else:
+        audio_path = "audio_file0.mp3"
+
+    backend = get_asr_backend()
+    with stage("speech_to_text.model_load"):
+        backend.load()
+    # Decode and transcribe in fixed windows so that memory use is bounded for long audio
+    with stage("speech_to_text.inference"), torch_profile("whisper"):
+        result = transcribe_windows(backend, iter_audio_windows(audio_path))
+    record(audio_seconds=result['duration'])
+
+    # if result['language'] != 'en':
+    #     raise TranscriptionError("Only english language is supported for transcription.")
+
     manual_subtitles = True
-    del model
-    return result['text']
+    return result
+
+def get_transcript_language(video_link):
+    """
+    Gets the language of the transcript fetched or generated for a YouTube video.
+
+    Args:
+        video_link (str): A string containing the YouTube video link.
+
+    Returns:
+        str: The language code, e.g. "en" or "de", or None if the video hasn't been transcribed.
+    """
+    return _languages.get(get_video_id(video_link))
+
+def has_manual_subtitles(video_link):
+    """
+    Gets whether the transcript fetched for a YouTube video came from manually created subtitles.
+
+    Unlike the module-level manual_subtitles flag, which the latest call of
+    fetch_transcript sets, this is safe with concurrent requests.
+
+    Args:
+        video_link (str): A string containing the YouTube video link.
+
+    Returns:
+        bool: True for manual subtitles, False for generated captions, speech recognition or an untranscribed video.
+    """
+    return bool(_manual_subtitles.get(get_video_id(video_link)))
+
+def get_transcript_segments(video_link):
+    """
+    Gets the timed transcript of a YouTube video.
+
+    Segments recorded by fetch_transcript or speech_to_text are reused;
+    otherwise the video is transcribed first.
+
+    Args:
+        video_link (str): A string containing the YouTube video link.
+
+    Returns:
+        list: Segments as {"start", "end", "text"} dictionaries, times in seconds.
+
+    Raises:
+        PipelineError: If the video could not be transcribed.
+    """
+    video_id = get_video_id(video_link)
+    segments = _segments.get(video_id)
+    if segments is None:
+        fetch_transcript(video_link)
+        segments = _segments.get(video_id)
+    return segments
 
    
 # print(speech_to_text("https://www.youtube.com/watch?v=lAfcr-SmRX4"))
@@ -0,0 +1,203 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import metrics
+from profiling import profile_job
+
+logger = logging.getLogger(__name__)
+
+# Number of inference worker processes; 0 runs inference in the calling process
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+# Torch intra-op threads per worker; 0 divides the available cores between the workers
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", "0"))
+# Pin each worker to its own set of TORCH_THREADS cores
+PIN_WORKERS = os.environ.get("PIN_WORKERS", "0") == "1"
+
+_THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores():
+    """
+    Returns:
+        list: The CPU cores this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def threads_per_worker(workers, threads=0):
+    """
+    Returns:
+        int: The configured threads per worker, or the available cores divided between the workers.
+    """
+    if threads > 0:
+        return threads
+    return max(1, len(available_cores()) // max(workers, 1))
+
+
+def configure_threads(threads):
+    """
+    Limit torch and the BLAS libraries to the given number of threads in this process.
+
+    Args:
+        threads (int): The number of intra-op threads.
+    """
+    for variable in _THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    try:
+        import torch
+    except ImportError:
+        # Engines without torch (e.g. faster-whisper) follow OMP_NUM_THREADS
+        return
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before torch runs any parallel work
+        pass
+
+
+def _init_worker(slot_counter, threads, pin):
+    """
+    Set up an inference worker: claim a slot, pin it to its cores and limit its threads.
+    """
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+    if pin and hasattr(os, "sched_setaffinity"):
+        cores = available_cores()
+        start = (slot * threads) % len(cores)
+        os.sched_setaffinity(0, cores[start:start + threads] or cores)
+    configure_threads(threads)
+    metrics.collect()
+
+
+def _run_job(func, args, kwargs):
+    """
+    Run a job in a worker and return its result with the metrics spans it recorded.
+    """
+    with profile_job(func.__name__):
+        result = func(*args, **kwargs)
+    return result, metrics.take_collected()
+
+
+class InferencePool:
+    """
+    Pool of inference worker processes, each running a fixed number of torch threads.
+
+    Jobs and results travel over the pool's IPC queues, so functions and
+    arguments must be picklable (e.g. module-level functions). Each worker
+    keeps its models loaded between jobs.
+
+    Args:
+        workers (int): The number of worker processes.
+        threads (int): Torch threads per worker, 0 to divide the cores between the workers.
+        pin (bool): Pin each worker to its own cores.
+    """
+
+    def __init__(self, workers, threads=0, pin=False):
+        self.workers = workers
+        self.threads = threads_per_worker(workers, threads)
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(context.Value("i", 0), self.threads, pin),
+        )
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) in a worker and wait for the result.
+        Exceptions raised in the worker are re-raised here.
+        """
+        result, spans = self._executor.submit(_run_job, func, args, kwargs).result()
+        metrics.merge(spans)
+        return result
+
+    def pids(self):
+        """
+        Returns:
+            list: The process IDs of the running workers.
+        """
+        return list(self._executor._processes or {})
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local_threads_configured = False
+
+
+def get_pool():
+    """
+    Returns:
+        InferencePool: The shared worker pool, or None when INFERENCE_WORKERS is 0.
+    """
+    global _pool
+    if INFERENCE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool(INFERENCE_WORKERS, TORCH_THREADS, PIN_WORKERS)
+        return _pool
+
+
+def worker_pids():
+    """
+    Returns:
+        list: The process IDs of the running inference workers, empty when there is no pool.
+    """
+    with _pool_lock:
+        pool = _pool
+    return pool.pids() if pool is not None else []
+
+
+def _replace_pool(broken):
+    """
+    Discard a pool whose worker died (e.g. killed for running out of memory),
+    so that get_pool starts a new one. Only the first caller replaces it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def run_inference(func, *args, **kwargs):
+    """
+    Run a summarization or speech recognition job according to the worker topology.
+
+    With INFERENCE_WORKERS set the job is dispatched to the worker pool, which
+    is restarted if a worker dies; otherwise it runs in the calling process, limited to TORCH_THREADS threads
+    when that is set. Jobs are profiled when profiling is enabled (see profiling.py).
+
+    Returns:
+        The result of func(*args, **kwargs).
+    """
+    global _local_threads_configured
+    pool = get_pool()
+    if pool is not None:
+        try:
+            return pool.run(func, *args, **kwargs)
+        except BrokenProcessPool:
+            # A dead worker breaks the whole executor; retry once in a fresh pool
+            logger.warning("Inference worker died, restarting the worker pool")
+            _replace_pool(pool)
+            return get_pool().run(func, *args, **kwargs)
+    if TORCH_THREADS > 0 and not _local_threads_configured:
+        with _pool_lock:
+            if not _local_threads_configured:
+                configure_threads(TORCH_THREADS)
+                _local_threads_configured = True
+    with profile_job(func.__name__):
+        return func(*args, **kwargs)